@@ -1,150 +1,287 @@
-from flask import Flask, render_template, request
-import os
-import joblib
+from flask import Flask, Response, g, render_template, request, jsonify
+import hashlib
 import json
-from pathlib import Path
+import os
+import time
+from cropyield.cache import PredictionCache, SQLiteBackend, cache_key
+from cropyield.executor import BoundedExecutor, Saturated
+from cropyield.feedback import FEEDBACK_FILE, FeedbackLog, parse_feedback
+from cropyield.metrics import SlowRequestProfiler, metrics, timer
+from cropyield.predict import predict_crop_batch
+from cropyield.records import parse_record, parse_records
+from cropyield.registry import registry
+from cropyield.responses import Representation, compress_response
+from cropyield.scenarios import run_scenarios, scenario_count
 
 app = Flask(__name__)
 
-PROJECT_ROOT = r"C:\Users\balaj\Pictures\hackathon now"
+# PREDICTION_CACHE_DB points at a SQLite file shared by all workers (optional)
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get("PREDICTION_CACHE_SIZE", 4096)),
+    ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 3600)),
+    backend=SQLiteBackend(os.environ["PREDICTION_CACHE_DB"]) if os.environ.get("PREDICTION_CACHE_DB") else None
+)
 
-yield_model = joblib.load(os.path.join(PROJECT_ROOT, "models", "yield_model.pkl"))
-yield_encoders = joblib.load(os.path.join(PROJECT_ROOT, "encoders", "yield_encoders.pkl"))
-crop_model = joblib.load(os.path.join(PROJECT_ROOT, "models", "crop_model.pkl"))
-crop_label_encoder = joblib.load(os.path.join(PROJECT_ROOT, "encoders", "crop_label_encoder.pkl"))
-fert_model = joblib.load(os.path.join(PROJECT_ROOT, "models", "fertilizer_model.pkl"))
-fert_encoders = joblib.load(os.path.join(PROJECT_ROOT, "encoders", "fertilizer_encoders.pkl"))
+# Inference runs on two bounded lanes so a large API batch can't stall the form page;
+# when a lane and its queue are full the request gets a 503 right away
+interactive_lane = BoundedExecutor("interactive",
+                                   workers=int(os.environ.get("CROP_INTERACTIVE_THREADS", 4)),
+                                   queue_size=int(os.environ.get("CROP_INTERACTIVE_QUEUE", 32)))
+batch_lane = BoundedExecutor("batch",
+                             workers=int(os.environ.get("CROP_BATCH_THREADS", 2)),
+                             queue_size=int(os.environ.get("CROP_BATCH_QUEUE", 4)))
+MAX_BATCH_RECORDS = int(os.environ.get("CROP_MAX_BATCH", 10000))
+# Pages: index.html is rendered and compressed once per process (again only if the
+# template changes) and revalidated with ETag / Last-Modified; result pages are
+# rendered once per distinct result. CROP_PAGE_MAX_AGE: browser cache lifetime of /.
+PAGE_MAX_AGE = int(os.environ.get("CROP_PAGE_MAX_AGE", 600))
+static_pages = {}
+result_fragments = PredictionCache(maxsize=int(os.environ.get("CROP_FRAGMENT_CACHE_SIZE", 1024)),
+                                   ttl=float(os.environ.get("PREDICTION_CACHE_TTL", 3600)))
 
-fert_gain_path = Path(os.path.join(PROJECT_ROOT, "encoders", "fert_gain_table.json"))
-if fert_gain_path.exists():
-    fert_gain_table = json.load(open(fert_gain_path))
-else:
-    fert_gain_table = {}
+# observed outcomes for training/update_models.py, under the artifact root (not a release)
+feedback_log = FeedbackLog(os.path.join(registry.root, FEEDBACK_FILE))
 
-DEFAULT_FERT_GAIN = 0.10
-YIELD_SCALE_FACTOR = 100.0
+# CROP_PROFILE_SAMPLE / CROP_PROFILE_SLOW_MS / CROP_PROFILE_DIR, see cropyield/metrics.py
+profiler = SlowRequestProfiler.from_env()
+metrics.describe("crop_request_seconds", "End-to-end request latency")
+metrics.describe("crop_requests_in_flight", "Requests currently being handled by this process")
 
 
-def safe_encode(encoder, value):
-    try:
-        return encoder.transform([str(value).lower()])[0]
-    except Exception:
-        return -1
-
-
-def encode_yield_input(state, district, crop_year, season, crop_str, area):
-    s = safe_encode(yield_encoders['state_name'], state)
-    d = safe_encode(yield_encoders['district_name'], district)
-    se = safe_encode(yield_encoders['season'], season)
-    crop_enc = safe_encode(yield_encoders['crop'], crop_str)
-    return [s, d, int(crop_year), se, crop_enc, float(area)]
-
-
-def compute_fert_gain(crop_str, fert_name):
-    crop_str = str(crop_str).lower()
-    fert_name = str(fert_name).lower()
-    if crop_str in fert_gain_table and fert_name in fert_gain_table[crop_str]:
-        return float(fert_gain_table[crop_str][fert_name])
-    return DEFAULT_FERT_GAIN
-
-
-def predict_crop(farm_meta, soil_weather, selected_crop):
-    farm_meta = {k: (v.lower() if isinstance(v, str) else v) for k, v in farm_meta.items()}
-    soil_weather = {k: (v.lower() if isinstance(v, str) else v) for k, v in soil_weather.items()}
-    selected_crop = selected_crop.lower()
-
-    X_sel = encode_yield_input(
-        farm_meta['state'], farm_meta['district'],
-        farm_meta['crop_year'], farm_meta['season'],
-        selected_crop, farm_meta['area']
-    )
-    sel_yield = yield_model.predict([X_sel])[0] * YIELD_SCALE_FACTOR
-
-    st_enc = safe_encode(fert_encoders['Soil Type'], soil_weather['Soil Type'])
-    ct_enc = safe_encode(fert_encoders['Crop Type'], selected_crop)
-    fert_features = [soil_weather['Temperature'], soil_weather['Humidity'],
-                     soil_weather['Soil Moisture'], st_enc, ct_enc,
-                     soil_weather['N'], soil_weather['K'], soil_weather['P']]
-    fert_idx = fert_model.predict([fert_features])[0]
-    fert_name_sel = fert_encoders['Fertilizer Name'].inverse_transform([fert_idx])[0]
-    fert_gain_sel = compute_fert_gain(selected_crop, fert_name_sel)
-    final_yield_sel = sel_yield * (1 + fert_gain_sel)
-
-    crop_features = [soil_weather['N'], soil_weather['P'], soil_weather['K'],
-                     soil_weather['temperature'], soil_weather['humidity'],
-                     soil_weather['ph'], soil_weather['rainfall']]
-    alt_idx = crop_model.predict([crop_features])[0]
-    alt_crop = crop_label_encoder.inverse_transform([alt_idx])[0].lower()
-
-    X_alt = encode_yield_input(
-        farm_meta['state'], farm_meta['district'],
-        farm_meta['crop_year'], farm_meta['season'],
-        alt_crop, farm_meta['area']
-    )
-    alt_yield = yield_model.predict([X_alt])[0] * YIELD_SCALE_FACTOR
-
-    ct_alt_enc = safe_encode(fert_encoders['Crop Type'], alt_crop)
-    fert_features_alt = [soil_weather['Temperature'], soil_weather['Humidity'],
-                         soil_weather['Soil Moisture'], st_enc, ct_alt_enc,
-                         soil_weather['N'], soil_weather['K'], soil_weather['P']]
-    fert_idx_alt = fert_model.predict([fert_features_alt])[0]
-    fert_name_alt = fert_encoders['Fertilizer Name'].inverse_transform([fert_idx_alt])[0]
-    fert_gain_alt = compute_fert_gain(alt_crop, fert_name_alt)
-    final_yield_alt = alt_yield * (1 + fert_gain_alt)
-    diff_pct_alt = ((final_yield_alt - final_yield_sel) / final_yield_sel) * 100 if final_yield_sel > 0 else 0
-
-    return {
-        "selected_crop": selected_crop.capitalize(),
-        "sel_yield": round(float(sel_yield), 2),
-        "fert_name_sel": fert_name_sel,
-        "fert_gain_sel": round(float(fert_gain_sel * 100), 2),
-        "final_yield_sel": round(float(final_yield_sel), 2),
-        "alt_crop": alt_crop.capitalize(),
-        "alt_yield": round(float(alt_yield), 2),
-        "fert_name_alt": fert_name_alt,
-        "fert_gain_alt": round(float(fert_gain_alt * 100), 2),
-        "final_yield_alt": round(float(final_yield_alt), 2),
-        "diff_pct_alt": round(float(diff_pct_alt), 2)
-    }
+# CROP_RELOAD_INTERVAL: seconds between checks for a new releases/CURRENT (0 = never)
+RELOAD_INTERVAL = float(os.environ.get("CROP_RELOAD_INTERVAL", 5))
+
+
+@app.before_request
+def start_request():
+    registry.watch(RELOAD_INTERVAL)
+    g.started = time.perf_counter()
+    g.profile = profiler.start()
+    metrics.add("crop_requests_in_flight", 1)
+
+
+@app.after_request
+def finish_request(response):
+    if "started" not in g:
+        return response
+    elapsed = time.perf_counter() - g.started
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.observe("crop_request_seconds", elapsed, endpoint=endpoint, method=request.method)
+    metrics.add("crop_requests_total", 1, endpoint=endpoint, method=request.method, status=response.status_code)
+    if g.profile is not None:
+        path = g.profile.finish(elapsed, f"{request.method}-{endpoint}")
+        if path:
+            app.logger.warning("slow request %s %s took %.0f ms, profile written to %s",
+                               request.method, request.path, elapsed * 1000, path)
+    return response
+
+
+@app.after_request
+def compress(response):
+    return compress_response(response, request.accept_encodings)
+
+
+@app.teardown_request
+def end_request(exc):
+    # runs even when the view raised, so the gauge can't drift
+    if "started" in g:
+        metrics.add("crop_requests_in_flight", -1)
+
+
+def run_inference(lane, fn, *args, **kwargs):
+    # a sampled request also profiles the call on the lane thread
+    if g.get("profile") is not None:
+        fn = g.profile.wrap(fn)
+    return lane.run(fn, *args, **kwargs)
+
+
+def predict_crop_cached(farms, top_k=1):
+    # predict_crop_batch behind prediction_cache; only the misses reach the models
+    # farms: a FARM_DTYPE array from parse_records
+    with registry.pin() as version:
+        return _cached(farms, top_k, version)
+
+
+def _cached(farms, top_k, version):
+    keys = [cache_key(record, top_k, version) for record in farms.tolist()]
+    results = [prediction_cache.get(key) for key in keys]
+
+    missing = {}
+    for i, result in enumerate(results):
+        if result is None:
+            missing.setdefault(keys[i], []).append(i)
+    if missing:
+        todo = farms[[rows[0] for rows in missing.values()]]
+        for (key, rows), result in zip(missing.items(), predict_crop_batch(todo, top_k=top_k)):
+            prediction_cache.set(key, result)
+            for i in rows:
+                results[i] = result
+    return results
+
+
+def static_page(name):
+    path = os.path.join(app.root_path, app.template_folder, name)
+    mtime = int(os.path.getmtime(path))
+    page = static_pages.get(name)
+    if page is None or page.last_modified != mtime:
+        with timer("render"):
+            page = Representation(render_template(name).encode(), last_modified=mtime)
+        static_pages[name] = page
+    return page
+
+
+def result_page(result, season):
+    # keyed on the prediction itself, so every farm that gets the same answer shares the render
+    key = hashlib.sha256(json.dumps([result, season], sort_keys=True, default=str).encode()).hexdigest()
+    page = result_fragments.get(key)
+    if page is None:
+        with timer("render"):
+            page = Representation(render_template("result.html", result=result, season=season).encode(),
+                                  static=False)
+        result_fragments.set(key, page)
+    return page
+
+
+def parse_top_k(value):
+    # a positive whole number (JSON number or form/query string)
+    if isinstance(value, bool) or not str(value).strip().isdigit() or int(value) < 1:
+        raise ValueError(f"top_k must be a positive integer, got {value!r}")
+    return int(value)
+
+
+def wants_json():
+    # API clients get the bare result: ?format=json, or Accept preferring JSON over HTML
+    if request.args.get("format") == "json":
+        return True
+    return request.accept_mimetypes.best_match(["text/html", "application/json"]) == "application/json"
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
     if request.method == "POST":
-        state = request.form["state"]
-        district = request.form["district"]
-        crop_year = int(request.form["crop_year"])
-        season = request.form["season"]
-        area = float(request.form["area"])
-        N = int(request.form["N"])
-        P = int(request.form["P"])
-        K = int(request.form["K"])
-        temperature = float(request.form["temperature"])
-        humidity = float(request.form["humidity"])
-        ph = float(request.form["ph"])
-        rainfall = float(request.form["rainfall"])
-        soil_type = request.form["soil_type"]
-        soil_moisture = float(request.form["soil_moisture"])
-        selected_crop = request.form.get("crop")
-
-        farm = {
-            "state": state, "district": district,
-            "crop_year": crop_year, "season": season,
-            "area": area
-        }
-
-        soil_weather = {
-            "N": N, "P": P, "K": K,
-            "temperature": temperature, "humidity": humidity, "ph": ph, "rainfall": rainfall,
-            "Temperature": temperature, "Humidity": humidity, "Soil Moisture": soil_moisture,
-            "Soil Type": soil_type, "Crop Type": selected_crop
-        }
-
-        result = predict_crop(farm, soil_weather, selected_crop)
-        return render_template("result.html", result=result, season=season)
-
-    return render_template("index.html")
+        try:
+            with timer("parse_form"):
+                farm = parse_record(request.form)
+                top_k = parse_top_k(request.form.get("top_k", 1))
+        except (KeyError, ValueError) as e:
+            if wants_json():
+                return jsonify({"error": f"invalid input: {e}"}), 400
+            return f"Invalid input: {e}", 400
+        result = run_inference(interactive_lane, predict_crop_cached, farm, top_k=top_k)[0]
+        if wants_json():
+            return jsonify(result)
+        return result_page(result, request.form["season"]).respond(request, Response, "private, no-cache")
+
+    return static_page("index.html").respond(request, Response, f"public, max-age={PAGE_MAX_AGE}")
+
+
+@app.route("/api/predict/batch", methods=["POST"])
+def predict_batch():
+    # a list of farm objects, or {"farms": [...], "top_k": 3}; high-volume clients can send
+    # rows as arrays instead: {"columns": ["state", ...], "farms": [["Bihar", ...], ...]}
+    payload = request.get_json(silent=True)
+    records = payload.get("farms") if isinstance(payload, dict) else payload
+    top_k = payload.get("top_k", 1) if isinstance(payload, dict) else 1
+    if not isinstance(records, list):
+        return jsonify({"error": "expected a JSON list of farms or {\"farms\": [...]}"}), 400
+    if len(records) > MAX_BATCH_RECORDS:
+        return jsonify({"error": f"at most {MAX_BATCH_RECORDS} farms per request"}), 413
+
+    try:
+        top_k = parse_top_k(top_k)
+    except ValueError as e:
+        return jsonify({"error": str(e), "parameter": "top_k"}), 400
+    try:
+        with timer("parse_json"):
+            farms = parse_records(records, columns=payload.get("columns") if isinstance(payload, dict) else None)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"invalid farm record: {e}"}), 400
+
+    return jsonify({"results": run_inference(batch_lane, predict_crop_cached, farms, top_k=top_k)})
+
+
+@app.route("/api/feedback", methods=["POST"])
+def feedback():
+    # a list of observations, or {"observations": [...]}: the farm fields the prediction was
+    # made from (crop = the crop grown) plus observed_yield, optionally fertilizer and model_version
+    payload = request.get_json(silent=True)
+    observations = payload.get("observations") if isinstance(payload, dict) else payload
+    if not isinstance(observations, list) or not all(isinstance(o, dict) for o in observations):
+        return jsonify({"error": "expected a JSON list of observations or {\"observations\": [...]}"}), 400
+    if len(observations) > MAX_BATCH_RECORDS:
+        return jsonify({"error": f"at most {MAX_BATCH_RECORDS} observations per request"}), 413
+    try:
+        rows = parse_feedback(observations)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"invalid observation: {e}"}), 400
+    return jsonify({"logged": feedback_log.append(rows)}), 201
+
+
+@app.route("/api/predict/scenarios", methods=["POST"])
+def predict_scenarios():
+    # {"farm": {...form fields...}, "grid": {"crop": "all", "N": {"start": 0, "stop": 140, "step": 20}},
+    #  "sort_by": "final_yield", "limit": 20}
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("farm"), dict) \
+            or not isinstance(payload.get("grid", {}), dict):
+        return jsonify({"error": "expected {\"farm\": {...}, \"grid\": {...}}"}), 400
+
+    try:
+        with timer("parse_json"):
+            farm = parse_record(payload["farm"])
+            grid = payload.get("grid", {})
+            count = scenario_count(grid)
+            limit = payload.get("limit")
+            limit = None if limit is None else int(limit)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({"error": f"invalid scenario request: {e}"}), 400
+    if count > MAX_BATCH_RECORDS:
+        return jsonify({"error": f"{count} scenarios, at most {MAX_BATCH_RECORDS} per request"}), 413
+
+    try:
+        result = run_inference(batch_lane, run_scenarios, farm, grid,
+                               sort_by=payload.get("sort_by", "final_yield"), limit=limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.errorhandler(Saturated)
+def saturated(e):
+    body = jsonify({"error": str(e)}) if request.path.startswith("/api/") else "Server busy, please retry shortly."
+    return body, 503, {"Retry-After": "1"}
+
+
+@app.route("/api/server/status")
+def server_status():
+    return jsonify({"pid": os.getpid(), "lanes": {"interactive": interactive_lane.stats(), "batch": batch_lane.stats()}})
+
+
+@app.route("/api/models/status")
+def models_status():
+    return jsonify(dict(registry.status(), artifact_dir=registry.artifact_dir, load_seconds=registry.timings()))
+
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify(prediction_cache.stats())
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    # per process: scrape every worker, or run a single worker behind the scraper
+    cache = prediction_cache.stats()
+    for name in ("hits", "misses", "evictions"):
+        metrics.set(f"crop_cache_{name}_total", cache[name])
+    metrics.set("crop_cache_hit_ratio", cache["hit_rate"])
+    metrics.set("crop_result_page_cache_hit_ratio", result_fragments.stats()["hit_rate"])
+    for lane in (interactive_lane, batch_lane):
+        stats = lane.stats()
+        metrics.set("crop_lane_in_flight", stats["in_flight"], lane=lane.name)
+        metrics.set("crop_lane_rejected_total", stats["rejected"], lane=lane.name)
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 if __name__ == "__main__":
+    registry.load_all()
     app.run(debug=True)
@@ -0,0 +1,231 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from cropyield.predict import YIELD_SCALE_FACTOR, YIELD_TABLE_MODE, predict_crop_batch, predict_yield
+from cropyield.records import parse_records
+from cropyield.registry import ModelRegistry, registry
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+UNKNOWN_SHARE = 0.1
+
+
+# ----------------------
+# Synthetic inputs matching the training schemas
+# ----------------------
+def synthetic_records(n, seed=0):
+    rng = np.random.default_rng(seed)
+    # data/ lives in the working tree; releases only hold model artifacts
+    crop_df = pd.read_csv(os.path.join(registry.root, "data", "processed_crop_recommendation.csv"))
+    fert_df = pd.read_csv(os.path.join(registry.root, "data", "processed_fertilizer_recommendation.csv"))
+    yield_encoders = registry.get("yield_encoders")
+    crop_labels = registry.get("crop_label_encoder")
+
+    def uniform(df, col, integer=False):
+        values = rng.uniform(df[col].min(), df[col].max(), n)
+        return np.round(values).astype(int) if integer else np.round(values, 2)
+
+    def categorical(choices, unknown):
+        values = rng.choice(np.asarray(choices, dtype=object), n)
+        values[rng.random(n) < UNKNOWN_SHARE] = unknown
+        return values
+
+    columns = {
+        "state": categorical(yield_encoders["state_name"].classes, "unknown state"),
+        "district": categorical(yield_encoders["district_name"].classes, "unknown district"),
+        "crop_year": rng.integers(1997, 2025, n),
+        "season": categorical(yield_encoders["season"].classes, "monsoon"),
+        "area": np.round(rng.lognormal(1.5, 1.0, n), 2),
+        "N": uniform(crop_df, "N", True), "P": uniform(crop_df, "P", True), "K": uniform(crop_df, "K", True),
+        "temperature": uniform(crop_df, "temperature"), "humidity": uniform(crop_df, "humidity"),
+        "ph": uniform(crop_df, "ph"), "rainfall": uniform(crop_df, "rainfall"),
+        "soil_type": categorical(fert_df["Soil Type"].unique(), "peaty"),
+        "soil_moisture": uniform(fert_df, "Soil Moisture"),
+        "crop": categorical(list(crop_labels.classes) + list(fert_df["Crop Type"].unique()), "quinoa"),
+    }
+    return pd.DataFrame(columns).to_dict("records")
+
+
+# ----------------------
+# Measurements
+# ----------------------
+def percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(samples, 50)), 3),
+            "p95_ms": round(float(np.percentile(samples, 95)), 3),
+            "p99_ms": round(float(np.percentile(samples, 99)), 3)}
+
+
+def timed(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def repeats_for(batch_size, budget_rows=20000):
+    return int(min(200, max(5, budget_rows // batch_size)))
+
+
+def bench_predict(records, batch_sizes):
+    results = {}
+    for size in batch_sizes:
+        farms = parse_records(records[:size])
+        samples = timed(lambda: predict_crop_batch(farms), repeats_for(size))
+        stats = percentiles(samples)
+        stats["rows_per_sec"] = round(size / float(np.median(samples)), 1)
+        results[str(size)] = stats
+    return results
+
+
+def bench_stages(records, batch_size):
+    # the pieces of predict_crop_batch, timed separately on the same batch
+    yield_encoders, fert_encoders = registry.get("yield_encoders"), registry.get("fert_encoders")
+    crop_labels = registry.get("crop_label_encoder")
+    crop_model, yield_model, fert_model = (registry.get("crop_model"), registry.get("yield_model"),
+                                           registry.get("fert_model"))
+    df = pd.DataFrame(records[:batch_size])
+    crops = df["crop"].str.lower().tolist()
+
+    def encode():
+        return (np.column_stack([
+            yield_encoders["state_name"].encode_many(df["state"].tolist()),
+            yield_encoders["district_name"].encode_many(df["district"].tolist()),
+            df["crop_year"].to_numpy(),
+            yield_encoders["season"].encode_many(df["season"].tolist()),
+            yield_encoders["crop"].encode_many(crops),
+            df["area"].to_numpy(),
+        ]).astype(float), np.column_stack([
+            df[["temperature", "humidity", "soil_moisture"]].to_numpy(dtype=float),
+            fert_encoders["Soil Type"].encode_many(df["soil_type"].tolist()),
+            fert_encoders["Crop Type"].encode_many(crops),
+            df[["N", "K", "P"]].to_numpy(dtype=float),
+        ]))
+
+    yield_X, fert_X = encode()
+    crop_X = df[["N", "P", "K", "temperature", "humidity", "ph", "rainfall"]].to_numpy(dtype=float)
+    crop_codes, fert_codes = crop_model.predict(crop_X), fert_model.predict(fert_X)
+
+    def inverse():
+        crop_labels.decode_many(crop_codes)
+        fert_encoders["Fertilizer Name"].decode_many(fert_codes)
+
+    repeats = repeats_for(batch_size, 5000)
+    stages = {
+        "parse": timed(lambda: parse_records(records[:batch_size]), repeats),
+        "encoding": timed(encode, repeats),
+        "crop": timed(lambda: crop_model.predict(crop_X), repeats),
+        # as served (table first when CROP_YIELD_TABLE is on), and the bare model for reference
+        "yield": timed(lambda: predict_yield(yield_X), repeats),
+        "yield_model": timed(lambda: yield_model.predict(yield_X) * YIELD_SCALE_FACTOR, repeats),
+        "fertilizer": timed(lambda: fert_model.predict(fert_X), repeats),
+        "inverse_transform": timed(inverse, repeats),
+    }
+    return {name: percentiles(samples) for name, samples in stages.items()}
+
+
+def bench_load():
+    # a fresh registry, so every artifact is read again (page cache may be warm)
+    fresh = ModelRegistry(registry.artifact_dir)
+    start = time.perf_counter()
+    fresh.load_all()
+    return {"total_seconds": round(time.perf_counter() - start, 4), "artifacts": fresh.timings(),
+            "compiled": type(fresh.get("crop_model")).__name__ == "CompiledForest"}
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+# ----------------------
+# Regression check
+# ----------------------
+def mismatched(current, baseline):
+    # timings are only comparable between runs over the same sizes and yield table mode
+    old = baseline.get("config", {})
+    return [f"{key}: {old.get(key)} in the baseline, {value} now"
+            for key, value in current["config"].items() if old.get(key) != value]
+
+
+def compare(current, baseline, threshold):
+    regressions = []
+    for size, stats in current["predict_crop"].items():
+        old = baseline.get("predict_crop", {}).get(size)
+        if old and stats["p50_ms"] > old["p50_ms"] * (1 + threshold):
+            regressions.append(f"predict_crop batch={size}: p50 {old['p50_ms']}ms -> {stats['p50_ms']}ms")
+    for stage, stats in current["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if old and stats["p50_ms"] > old["p50_ms"] * (1 + threshold):
+            regressions.append(f"stage {stage}: p50 {old['p50_ms']}ms -> {stats['p50_ms']}ms")
+    old_load = baseline.get("artifact_load", {}).get("total_seconds")
+    if old_load and current["artifact_load"]["total_seconds"] > old_load * (1 + threshold):
+        regressions.append(f"artifact load: {old_load}s -> {current['artifact_load']['total_seconds']}s")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark predict_crop, the encoders and each model")
+    parser.add_argument("--batch-sizes", default="1,10,100,1000,10000")
+    parser.add_argument("--stage-batch", type=int, default=1000)
+    parser.add_argument("--output", help="write the results JSON here")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    batch_sizes = [int(s) for s in args.batch_sizes.split(",")]
+    load = bench_load()
+    registry.load_all()
+    records = synthetic_records(max(batch_sizes + [args.stage_batch]))
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "artifact_dir": registry.artifact_dir,
+        "config": {"batch_sizes": batch_sizes, "stage_batch": args.stage_batch, "records": len(records),
+                   "yield_table": YIELD_TABLE_MODE},
+        "artifact_load": load,
+        "predict_crop": bench_predict(records, batch_sizes),
+        "stages": bench_stages(records, args.stage_batch),
+    }
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        differences = mismatched(results, baseline)
+        for line in differences:
+            print(f"❌ not comparable with {args.baseline}: {line}", file=sys.stderr)
+        if differences:
+            return 2
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"❌ {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("✅ no regressions", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
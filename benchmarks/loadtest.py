@@ -0,0 +1,115 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ----------------------
+# HTTP load test for serve.py
+# ----------------------
+def random_farm(rng):
+    # random soil values so requests miss the prediction cache
+    return {
+        "state": rng.choice(["Andhra Pradesh", "Bihar", "Punjab", "Karnataka"]),
+        "district": rng.choice(["KURNOOL", "PATNA", "LUDHIANA", "MYSORE"]),
+        "crop_year": rng.randint(2000, 2024), "season": rng.choice(["Kharif", "Rabi", "Whole Year"]),
+        "area": round(rng.uniform(0.5, 50), 2),
+        "N": rng.randint(0, 140), "P": rng.randint(5, 145), "K": rng.randint(5, 205),
+        "temperature": round(rng.uniform(8, 44), 2), "humidity": round(rng.uniform(14, 100), 2),
+        "ph": round(rng.uniform(3.5, 9.9), 2), "rainfall": round(rng.uniform(20, 300), 2),
+        "soil_type": rng.choice(["Sandy", "Loamy", "Black", "Red", "Clayey"]),
+        "soil_moisture": round(rng.uniform(25, 65), 1),
+        "crop": rng.choice(["rice", "maize", "cotton", "wheat"]),
+    }
+
+
+def load(url, concurrency, duration, batch_size):
+    counts = {"ok": 0, "busy": 0, "error": 0}
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while time.perf_counter() < deadline:
+            body = json.dumps({"farms": [random_farm(rng) for _ in range(batch_size)]}).encode()
+            req = urllib.request.Request(f"{url}/api/predict/batch", data=body,
+                                         headers={"Content-Type": "application/json"})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(req, timeout=60) as resp:
+                    resp.read()
+                outcome = "ok"
+            except urllib.error.HTTPError as e:
+                outcome = "busy" if e.code == 503 else "error"
+            except OSError:
+                outcome = "error"
+            with lock:
+                counts[outcome] += 1
+                if outcome == "ok":
+                    latencies.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    p = lambda q: round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1) if latencies else None
+    return dict(counts, farms_per_sec=round(counts["ok"] * batch_size / duration, 1),
+                p50_ms=p(0.50), p95_ms=p(0.95))
+
+
+def wait_until_up(url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{url}/api/server/status", timeout=1).read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"server at {url} did not come up")
+
+
+def sweep(worker_counts, port, **kwargs):
+    # start serve.py with each worker count and load it; throughput should grow with cores
+    results = {}
+    for workers in worker_counts:
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "serve.py"), "--host", "127.0.0.1",
+                                   "--port", str(port), "--workers", str(workers)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            wait_until_up(url)
+            results[workers] = load(url, **kwargs)
+            print(f"workers={workers}: {results[workers]}")
+        finally:
+            server.terminate()
+            server.wait()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the crop yield server")
+    parser.add_argument("--url", help="load an already running server instead of sweeping")
+    parser.add_argument("--sweep", default="1,2,4", help="worker counts to start serve.py with")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=1)
+    args = parser.parse_args()
+
+    options = {"concurrency": args.concurrency, "duration": args.duration, "batch_size": args.batch_size}
+    if args.url:
+        print(load(args.url.rstrip("/"), **options))
+    else:
+        sweep([int(w) for w in args.sweep.split(",")], args.port, **options)
@@ -0,0 +1 @@
+# Shared serving code used by app.py and integration/integrate_models.py
@@ -0,0 +1,146 @@
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from cropyield.predict import predict_crop_batch
+from cropyield.records import parse_records
+from cropyield.registry import registry
+
+RESULT_COLUMNS = ["selected_crop", "sel_yield", "fert_name_sel", "fert_gain_sel", "final_yield_sel",
+                  "alt_crop", "alt_yield", "fert_name_alt", "fert_gain_alt", "final_yield_alt", "diff_pct_alt",
+                  "model_version"]
+
+
+# ----------------------
+# Chunked input (CSV, or Parquet when pyarrow is installed)
+# ----------------------
+def _parquet(path):
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet input needs pyarrow: pip install pyarrow")
+    return pq.ParquetFile(path)
+
+
+def _read_chunks(path, chunk_size):
+    if path.endswith(".parquet"):
+        for batch in _parquet(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        # everything as text, the same way parse_records sees form fields
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=str, keep_default_na=False)
+
+
+def iter_chunks(path, chunk_size, offset=0):
+    # the offset counts records, not lines (quoted fields may hold newlines)
+    seen = 0
+    for df in _read_chunks(path, chunk_size):
+        start, seen = seen, seen + len(df)
+        if seen <= offset:
+            continue
+        yield df.iloc[max(offset - start, 0):].reset_index(drop=True)
+
+
+def input_columns(path):
+    if path.endswith(".parquet"):
+        return list(_parquet(path).schema_arrow.names)
+    return list(pd.read_csv(path, nrows=0, dtype=str).columns)
+
+
+def complete_rows(path):
+    # -> (header, records after it, byte size up to the end of the last complete record);
+    # a record cut off mid-write (no newline, too few fields, an open quote) is not counted
+    if not os.path.exists(path):
+        return None, 0, 0
+    read = {"bytes": 0, "newline": True}
+
+    def lines(f):
+        for line in f:
+            read["bytes"] += len(line)
+            read["newline"] = line.endswith(b"\n")
+            yield line.decode("utf-8", "replace")
+
+    header, rows, end = None, 0, 0
+    with open(path, "rb") as f:
+        try:
+            for record in csv.reader(lines(f)):
+                if not read["newline"] or (header is not None and len(record) != len(header)):
+                    break
+                if header is None:
+                    header = record
+                else:
+                    rows += 1
+                end = read["bytes"]
+        except csv.Error:
+            pass
+    return header, rows, end
+
+
+# ----------------------
+# Scoring
+# ----------------------
+def score_chunk(df):
+    # columns go straight into one FARM_DTYPE array; bad rows get an error instead of a result
+    farms, rows, messages = parse_records(df, skip_invalid=True)
+    errors = [""] * len(df)
+    for i, message in messages.items():
+        errors[i] = message
+
+    out = pd.DataFrame(index=range(len(df)), columns=RESULT_COLUMNS, dtype=object)
+    if len(farms):
+        results = pd.DataFrame(predict_crop_batch(farms), columns=RESULT_COLUMNS)
+        out.iloc[rows] = results.to_numpy(dtype=object)
+    out["error"] = errors
+    return pd.concat([df.reset_index(drop=True), out], axis=1)
+
+
+def _in_order(pool, chunks, window):
+    # at most `window` chunks in flight, so memory stays bounded whatever the input size
+    pending = deque()
+    for chunk in chunks:
+        pending.append(pool.submit(score_chunk, chunk))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def bulk_score(input_path, output_path, chunk_size=50000, workers=1, offset=0, resume=False, log=sys.stderr):
+    if resume:
+        header, offset, end = complete_rows(output_path)
+        if header is not None and header != input_columns(input_path) + RESULT_COLUMNS + ["error"]:
+            raise SystemExit(f"{output_path} has different columns than this run writes; "
+                             f"score it again without --resume")
+        if header is not None and end < os.path.getsize(output_path):
+            # drop the record an interrupted run was writing before appending after it
+            print(f"⚠️ {output_path}: discarding {os.path.getsize(output_path) - end} bytes after "
+                  f"record {offset}", file=log)
+            os.truncate(output_path, end)
+    append = offset > 0 and os.path.exists(output_path)
+
+    # load once in the parent so forked workers share the pages
+    registry.load_all()
+    chunks = iter_chunks(input_path, chunk_size, offset)
+
+    start, done = time.perf_counter(), 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        scored = _in_order(pool, chunks, workers * 2) if pool else map(score_chunk, chunks)
+        with open(output_path, "a" if append else "w", newline="") as f:
+            for df in scored:
+                df.to_csv(f, header=not append and done == 0, index=False)
+                f.flush()
+                done += len(df)
+                elapsed = time.perf_counter() - start
+                print(f"{offset + done} rows scored ({done / elapsed:,.0f} rows/s)", file=log)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - start
+    return {"rows": done, "offset": offset, "seconds": elapsed, "rows_per_sec": done / elapsed if elapsed else 0.0}
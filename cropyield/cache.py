@@ -0,0 +1,141 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# ----------------------
+# Cache keys
+# ----------------------
+# Same normalisation predict_crop applies (lowercased, not stripped: the encoders
+# see "Punjab " and "Punjab" as different values) plus rounding of the float
+# soil/weather values, so near-identical soil tests share an entry.
+# A record is one FARM_DTYPE row (cropyield/records.py) as a tuple; the artifact
+# release is part of the key, so a model swap never serves the old version's results.
+def _canonical(value, float_digits):
+    if isinstance(value, str):
+        return value.lower()
+    if isinstance(value, float):
+        return round(value, float_digits)
+    return value
+
+
+def cache_key(record, top_k=1, version=None, float_digits=2):
+    return tuple(_canonical(v, float_digits) for v in record) + (int(top_k), version)
+
+
+# ----------------------
+# Shared backends
+# ----------------------
+# Optional second level so several Flask/gunicorn workers see each other's warm entries.
+# Expired rows are deleted every purge_every writes, so the shared file stays bounded.
+class SQLiteBackend:
+    def __init__(self, path, purge_every=1000):
+        self.path = str(path)
+        self.purge_every = purge_every
+        self._writes = 0
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS predictions "
+                         "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        # -> (value, expires_at) or None
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM predictions WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key, value, expires_at):
+        self._writes += 1
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                         (key, json.dumps(value), expires_at))
+            if self.purge_every and self._writes % self.purge_every == 0:
+                conn.execute("DELETE FROM predictions WHERE expires_at < ?", (time.time(),))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM predictions")
+
+
+# ----------------------
+# In-process LRU + TTL cache
+# ----------------------
+class PredictionCache:
+    def __init__(self, maxsize=4096, ttl=3600, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        found = self.backend.get(json.dumps(key)) if self.backend is not None else None
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            # keep the shared expiry; copying an entry between workers must not extend it
+            value, expires_at = found
+            self._store(key, value, expires_at)
+        return value
+
+    def set(self, key, value):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+        if self.backend is not None:
+            self.backend.set(json.dumps(key), value, expires_at)
+
+    def _store(self, key, value, expires_at):
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
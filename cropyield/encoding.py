@@ -0,0 +1,39 @@
+import numpy as np
+
+
+# ----------------------
+# Compiled categorical encoders
+# ----------------------
+# LabelEncoder.transform([value]) validates input, builds arrays and runs
+# np.searchsorted for every single field. These tables are built once from the
+# fitted encoders and answer each lookup with one dict probe. Unknown values
+# map to -1 without raising, the same result safe_encode always returned.
+class LookupEncoder:
+    def __init__(self, encoder):
+        # a fitted LabelEncoder, or its classes_ as exported by training/export_models.py
+        self.classes = np.asarray(getattr(encoder, "classes_", encoder), dtype=object)
+        self.codes = {str(c): i for i, c in enumerate(self.classes)}
+
+    def __len__(self):
+        return len(self.classes)
+
+    def encode(self, value):
+        return self.codes.get(str(value).lower(), -1)
+
+    def encode_many(self, values):
+        get = self.codes.get
+        return np.fromiter((get(str(v).lower(), -1) for v in values), dtype=np.int64, count=len(values))
+
+    def decode(self, code):
+        return self.classes[int(code)]
+
+    def decode_many(self, codes):
+        return self.classes[np.asarray(codes, dtype=np.int64)]
+
+
+def compile_encoders(encoders):
+    # encoders: a single fitted LabelEncoder or a dict of them, as saved by training/train_*.py
+    # (or the same shape with plain class lists)
+    if isinstance(encoders, dict):
+        return {name: LookupEncoder(enc) for name, enc in encoders.items()}
+    return LookupEncoder(encoders)
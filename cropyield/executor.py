@@ -0,0 +1,52 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Saturated(Exception):
+    pass
+
+
+# ----------------------
+# Bounded inference lane
+# ----------------------
+# At most `workers` inference calls run and `queue_size` more wait; anything
+# beyond that is rejected straight away (the app turns it into a 503) instead
+# of piling up behind a slow batch.
+class BoundedExecutor:
+    def __init__(self, name, workers, queue_size):
+        self.name = name
+        self.workers = workers
+        self.queue_size = queue_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"inference-{name}")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise Saturated(f"{self.name} inference queue is full")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._pool.submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future.result(timeout=timeout)
+
+    def _release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "queue_size": self.queue_size,
+                    "in_flight": self.in_flight, "rejected": self.rejected}
+
+    def shutdown(self):
+        self._pool.shutdown(wait=True)
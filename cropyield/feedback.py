@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from cropyield.records import FARM_DTYPE, FIELDS, parse_records
+
+FEEDBACK_FILE = os.path.join("data", "feedback", "observations.bin")
+FEEDBACK_VERSION = 1
+TEXT_BYTES = 48
+
+# ----------------------
+# Field feedback log
+# ----------------------
+# Observed outcomes keyed to the inputs the prediction was made from: one fixed-width
+# binary record per observation (the FARM_DTYPE fields, crop = the crop actually grown),
+# appended with a single O_APPEND write so concurrent workers never interleave records.
+# observed_yield is in the units the app reports (predict_crop's kg/ha).
+FEEDBACK_DTYPE = np.dtype(
+    [("received_at", "<f8"), ("model_version", f"S{TEXT_BYTES}")]
+    + [(name, f"S{TEXT_BYTES}" if FARM_DTYPE[name].kind == "O" else FARM_DTYPE[name].newbyteorder("<"))
+       for name in FIELDS]
+    + [("observed_yield", "<f8"), ("fertilizer", f"S{TEXT_BYTES}")]
+)
+HEADER = f"cropyield-feedback v{FEEDBACK_VERSION} {FEEDBACK_DTYPE.itemsize}\n".encode().ljust(64)
+
+
+def _text(values):
+    return np.array([str(v).encode()[:TEXT_BYTES] for v in values], dtype=f"S{TEXT_BYTES}")
+
+
+def parse_feedback(observations):
+    # observations: mappings with the form fields plus observed_yield (and optionally
+    # fertilizer, model_version) -> FEEDBACK_DTYPE array; RecordError / ValueError on bad rows
+    farms = parse_records(observations)
+    out = np.zeros(len(farms), dtype=FEEDBACK_DTYPE)
+    for name in FIELDS:
+        out[name] = _text(farms[name]) if FARM_DTYPE[name].kind == "O" else farms[name]
+    for i, observation in enumerate(observations):
+        try:
+            value = float(observation["observed_yield"])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"row {i}, observed_yield: expected a number") from None
+        if not np.isfinite(value) or value < 0:
+            raise ValueError(f"row {i}, observed_yield: {value} is not a yield")
+        out["observed_yield"][i] = value
+    out["fertilizer"] = _text(o.get("fertilizer") or "" for o in observations)
+    out["model_version"] = _text(o.get("model_version") or "" for o in observations)
+    out["received_at"] = time.time()
+    return out
+
+
+class FeedbackLog:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, rows):
+        rows = np.ascontiguousarray(rows, dtype=FEEDBACK_DTYPE)
+        if not len(rows):
+            return 0
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size == 0:
+                    os.write(fd, HEADER)
+                os.write(fd, rows.tobytes())
+            finally:
+                os.close(fd)
+        return len(rows)
+
+    def read(self, start=0):
+        # -> every record from `start` on, memory-mapped; a torn trailing record is ignored
+        if not os.path.exists(self.path):
+            return np.zeros(0, dtype=FEEDBACK_DTYPE)
+        with open(self.path, "rb") as f:
+            header = f.read(len(HEADER))
+        if header != HEADER:
+            raise ValueError(f"{self.path} is not a v{FEEDBACK_VERSION} feedback log")
+        count = (os.path.getsize(self.path) - len(HEADER)) // FEEDBACK_DTYPE.itemsize
+        if count <= start:
+            return np.zeros(0, dtype=FEEDBACK_DTYPE)
+        return np.memmap(self.path, dtype=FEEDBACK_DTYPE, mode="r", offset=len(HEADER), shape=(count,))[start:]
+
+    def __len__(self):
+        if not os.path.exists(self.path):
+            return 0
+        return max(os.path.getsize(self.path) - len(HEADER), 0) // FEEDBACK_DTYPE.itemsize
+
+
+def decode_text(column):
+    return np.char.decode(np.asarray(column), "utf-8", "ignore").astype(object)
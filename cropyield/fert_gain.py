@@ -0,0 +1,125 @@
+import json
+import os
+
+import numpy as np
+
+DEFAULT_FERT_GAIN = 0.10
+GAIN_TABLE_VERSION = 1
+
+
+# ----------------------
+# Dense crop x fertilizer gain table
+# ----------------------
+# Rows follow fert_encoders['Crop Type'].classes_, columns follow
+# fert_encoders['Fertilizer Name'].classes_, so the column is simply the code
+# fert_model predicts. Crop rows are matched case-insensitively (predict_crop
+# works with lowercased crop names). Unknown crops get DEFAULT_FERT_GAIN.
+class FertGainTable:
+    def __init__(self, gain, crop_types, fertilizers, meta=None):
+        self.gain = np.asarray(gain, dtype=np.float64)
+        self.crop_types = [str(c) for c in crop_types]
+        self.fertilizers = [str(f) for f in fertilizers]
+        self.meta = meta or {}
+        self.crop_rows = {c.lower(): i for i, c in enumerate(self.crop_types)}
+        self.fert_cols = {f.lower(): j for j, f in enumerate(self.fertilizers)}
+
+    @classmethod
+    def empty(cls, fertilizers=()):
+        return cls(np.zeros((0, len(fertilizers))), [], fertilizers)
+
+    @classmethod
+    def from_dict(cls, table, fertilizers):
+        # legacy fert_gain_table.json: {crop: {fertilizer: gain}} with lowercased names
+        crops = sorted(table)
+        gain = np.full((len(crops), len(fertilizers)), DEFAULT_FERT_GAIN)
+        for i, crop in enumerate(crops):
+            for j, fert in enumerate(fertilizers):
+                gain[i, j] = float(table[crop].get(str(fert).lower(), DEFAULT_FERT_GAIN))
+        return cls(gain, crops, fertilizers)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != GAIN_TABLE_VERSION:
+                raise ValueError(f"unsupported fert gain table version {meta.get('version')} in {path}")
+            return cls(data["gain"], data["crop_types"].tolist(), data["fertilizers"].tolist(), meta)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        meta = dict(self.meta, version=GAIN_TABLE_VERSION)
+        np.savez(path, gain=self.gain, crop_types=np.array(self.crop_types, dtype=str),
+                 fertilizers=np.array(self.fertilizers, dtype=str), meta=np.array(json.dumps(meta)))
+
+    def align(self, fertilizers):
+        # reorder columns to the serving encoder's classes; missing fertilizers get the default
+        fertilizers = [str(f) for f in fertilizers]
+        if fertilizers == self.fertilizers:
+            return self
+        gain = np.full((len(self.crop_types), len(fertilizers)), DEFAULT_FERT_GAIN)
+        for j, fert in enumerate(fertilizers):
+            col = self.fert_cols.get(fert.lower())
+            if col is not None:
+                gain[:, j] = self.gain[:, col]
+        return FertGainTable(gain, self.crop_types, fertilizers, self.meta)
+
+    def row(self, crop):
+        return self.crop_rows.get(str(crop).lower(), -1)
+
+    def lookup(self, crop, fert_code):
+        row = self.row(crop)
+        return float(self.gain[row, int(fert_code)]) if row >= 0 else DEFAULT_FERT_GAIN
+
+    def lookup_name(self, crop, fert_name):
+        col = self.fert_cols.get(str(fert_name).lower())
+        return self.lookup(crop, col) if col is not None else DEFAULT_FERT_GAIN
+
+    def lookup_many(self, crops, fert_codes):
+        get = self.crop_rows.get
+        rows = np.fromiter((get(str(c).lower(), -1) for c in crops), dtype=np.int64, count=len(crops))
+        fert_codes = np.asarray(fert_codes, dtype=np.int64)
+        gains = np.full(len(rows), DEFAULT_FERT_GAIN)
+        known = rows >= 0
+        gains[known] = self.gain[rows[known], fert_codes[known]]
+        return gains
+
+
+# ----------------------
+# Building the table
+# ----------------------
+def build_gain_table(fert_df, yield_df, crop_types, fertilizers):
+    # gain(crop, fert) = headroom(crop) * share(crop, fert)
+    #   share    - how often the fertilizer is recommended for that crop type
+    #              in the fertilizer recommendation data, relative to the crop's
+    #              most recommended one (1.0), so the best fertilizer gets the full
+    #              headroom and the gains sit on the same scale as DEFAULT_FERT_GAIN;
+    #              crops with no fertilizer records get DEFAULT_FERT_GAIN like unknown ones
+    #   headroom - how far the upper quartile yield of that crop sits above its
+    #              median in the production data (what a better input can add),
+    #              capped at MAX_HEADROOM; 2 x DEFAULT_FERT_GAIN when the crop is
+    #              not in the production data
+    MAX_HEADROOM = 0.5
+    crop_types = [str(c) for c in crop_types]
+    fertilizers = [str(f) for f in fertilizers]
+
+    counts = (fert_df.assign(crop=fert_df["Crop Type"].astype(str).str.lower(),
+                             fert=fert_df["Fertilizer Name"].astype(str).str.lower())
+              .groupby(["crop", "fert"]).size().unstack(fill_value=0))
+    counts = counts.reindex(index=[c.lower() for c in crop_types],
+                            columns=[f.lower() for f in fertilizers], fill_value=0)
+    top = counts.max(axis=1).to_numpy(dtype=np.float64)[:, None] if counts.shape[1] else np.zeros((len(counts), 1))
+    share = np.divide(counts.to_numpy(dtype=np.float64), top, out=np.zeros(counts.shape), where=top > 0)
+
+    headroom = np.full(len(crop_types), 2 * DEFAULT_FERT_GAIN)
+    if yield_df is not None and len(yield_df):
+        y = yield_df.assign(crop=yield_df["crop"].astype(str).str.strip().str.lower())
+        y = y[y["yield_kg_per_ha"] > 0]
+        quartiles = y.groupby("crop")["yield_kg_per_ha"].quantile([0.5, 0.75]).unstack()
+        for i, crop in enumerate(crop_types):
+            if crop.lower() in quartiles.index:
+                median, upper = quartiles.loc[crop.lower(), 0.5], quartiles.loc[crop.lower(), 0.75]
+                headroom[i] = min(max((upper - median) / median, 0.0), MAX_HEADROOM)
+
+    gain = headroom[:, None] * share
+    gain[top[:, 0] == 0] = DEFAULT_FERT_GAIN
+    return FertGainTable(gain, crop_types, fertilizers)
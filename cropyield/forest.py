@@ -0,0 +1,159 @@
+import json
+import os
+
+import numpy as np
+
+# numpy-only inference for the RandomForest models; sklearn is only needed to export
+ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots")
+CHUNK_ROWS = 4096
+
+
+# ----------------------
+# Artifact files
+# ----------------------
+# Workers memory-map the .npy artifacts, so a file is never rewritten in place (a live
+# mapping would then read the new bytes through the old shapes): each is written next
+# to the old one and renamed over it, and mappings keep the file they opened.
+def save_array(path, arr):
+    tmp = f"{path}.tmp-{os.getpid()}.npy"
+    np.save(tmp, arr)
+    os.replace(tmp, path)
+
+
+def save_json(path, obj, **kwargs):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, **kwargs)
+    os.replace(tmp, path)
+
+
+# ----------------------
+# Export (needs sklearn)
+# ----------------------
+def _leaf_values(tree, is_classifier):
+    # exactly what DecisionTree*.predict(_proba) reads from tree_.value
+    if not is_classifier:
+        return tree.value[:, 0, 0].astype(np.float64)
+    value = tree.value[:, 0, :].astype(np.float64)
+    import sklearn
+    major, minor = (int(p) for p in sklearn.__version__.split(".")[:2])
+    if (major, minor) < (1, 4):
+        # older releases store class counts and normalise inside predict_proba
+        normalizer = value.sum(axis=1)[:, None]
+        normalizer[normalizer == 0.0] = 1.0
+        value = value / normalizer
+    return value
+
+
+def export_forest(model, out_dir, source=None):
+    # Flatten every tree of a fitted RandomForest into packed, contiguous arrays.
+    # Child indices are rebased so all trees live in one global node table.
+    is_classifier = hasattr(model, "classes_")
+    feature, threshold, left, right, missing_left, value, roots = [], [], [], [], [], [], []
+    offset = 0
+    for est in model.estimators_:
+        tree = est.tree_
+        is_leaf = tree.children_left == -1
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        left.append(np.where(is_leaf, -1, tree.children_left + offset).astype(np.int32))
+        right.append(np.where(is_leaf, -1, tree.children_right + offset).astype(np.int32))
+        missing = getattr(tree, "missing_go_to_left", np.zeros(tree.node_count, dtype=np.uint8))
+        missing_left.append(np.asarray(missing, dtype=bool))
+        value.append(_leaf_values(tree, is_classifier))
+        roots.append(offset)
+        offset += tree.node_count
+
+    os.makedirs(out_dir, exist_ok=True)
+    arrays = {
+        "feature": np.concatenate(feature), "threshold": np.concatenate(threshold),
+        "left": np.concatenate(left), "right": np.concatenate(right),
+        "missing_left": np.concatenate(missing_left), "value": np.concatenate(value),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    for name, arr in arrays.items():
+        save_array(os.path.join(out_dir, f"{name}.npy"), np.ascontiguousarray(arr))
+
+    meta = {
+        "kind": "classifier" if is_classifier else "regressor",
+        "n_features": int(model.n_features_in_),
+        "n_trees": len(model.estimators_),
+        "max_depth": int(max(est.tree_.max_depth for est in model.estimators_)),
+        "classes": model.classes_.tolist() if is_classifier else None,
+        "source": source,
+    }
+    save_json(os.path.join(out_dir, "meta.json"), meta, indent=2)
+    return meta
+
+
+# ----------------------
+# Inference
+# ----------------------
+class CompiledForest:
+    def __init__(self, arrays, meta):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+        self.n_trees = meta["n_trees"]
+        self.n_features_in_ = meta["n_features"]
+        self.is_classifier = meta["kind"] == "classifier"
+        self.classes_ = np.asarray(meta["classes"]) if self.is_classifier else None
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        # plain ndarray views over the mapping: np.memmap indexing is several times slower
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode).view(np.ndarray)
+                  for name in ARRAYS}
+        return cls(arrays, meta)
+
+    def apply(self, X):
+        # leaf index of every (row, tree); all trees descend together one level per step,
+        # and (row, tree) pairs drop out of the working set once they reach a leaf.
+        # sklearn compares float32 features against float64 thresholds, so we do too.
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        node = np.tile(np.asarray(self.roots, dtype=np.int64), n_rows)
+        rows = np.repeat(np.arange(n_rows), self.n_trees)
+        active = np.arange(node.size)
+        for _ in range(self.meta["max_depth"]):
+            current = node[active]
+            left = self.left[current]
+            internal = left != -1
+            if not internal.all():
+                active, current, left = active[internal], current[internal], left[internal]
+            if not active.size:
+                break
+            x = X[rows[active], self.feature[current]]
+            go_left = x <= self.threshold[current]
+            nan = np.isnan(x)
+            if nan.any():
+                go_left = np.where(nan, self.missing_left[current], go_left)
+            node[active] = np.where(go_left, left, self.right[current])
+        return node.reshape(n_rows, self.n_trees)
+
+    def _mean_leaf_value(self, X):
+        X = np.asarray(X)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        out = []
+        for start in range(0, X.shape[0], CHUNK_ROWS):
+            leaves = self.value[self.apply(X[start:start + CHUNK_ROWS])]
+            # accumulate tree by tree like RandomForest does, so sums match bit for bit
+            total = np.zeros(leaves.shape[:1] + leaves.shape[2:], dtype=np.float64)
+            for t in range(self.n_trees):
+                total += leaves[:, t]
+            total /= self.n_trees
+            out.append(total)
+        return np.concatenate(out) if out else np.zeros((0,) + self.value.shape[1:])
+
+    def predict_proba(self, X):
+        if not self.is_classifier:
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_leaf_value(X)
+
+    def predict(self, X):
+        if self.is_classifier:
+            return self.classes_.take(np.argmax(self._mean_leaf_value(X), axis=1), axis=0)
+        return self._mean_leaf_value(X)
@@ -0,0 +1,175 @@
+import bisect
+import cProfile
+import os
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# CROP_METRICS=0 turns every timer into a no-op
+ENABLED = os.environ.get("CROP_METRICS", "1") != "0"
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ----------------------
+# Histograms and gauges (per process)
+# ----------------------
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.gauges = {}
+        self.help = {}
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram()
+            hist.observe(value)
+
+    def add(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def describe(self, name, text):
+        self.help[name] = text
+
+    def render(self):
+        # Prometheus text exposition format
+        lines = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            gauges = sorted(self.gauges.items())
+        seen = set()
+        for (name, labels), hist in histograms:
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip([str(b) for b in hist.buckets] + ["+Inf"], hist.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        for (name, labels), value in gauges:
+            if name not in seen:
+                seen.add(name)
+                if name in self.help:
+                    lines.append(f"# HELP {name} {self.help[name]}")
+                lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in labels) + "}"
+
+
+metrics = Metrics()
+metrics.describe("crop_stage_seconds", "Time spent in each stage of a prediction request")
+
+
+@contextmanager
+def timer(stage):
+    if not ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.observe("crop_stage_seconds", time.perf_counter() - start, stage=stage)
+
+
+# ----------------------
+# Sampled profiling of slow requests
+# ----------------------
+# CROP_PROFILE_SAMPLE (0-1) of requests run under cProfile; the ones slower than
+# CROP_PROFILE_SLOW_MS are dumped to CROP_PROFILE_DIR as .prof files (open with pstats/snakeviz).
+class ProfileSession:
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.request = cProfile.Profile()
+        self.parts = []
+
+    def wrap(self, fn):
+        # inference runs on a lane thread, which needs its own profiler before Python 3.12;
+        # from 3.12 only one profiler can be active per process and the request's already
+        # sees every thread, so the lane runs unprofiled when enable() refuses
+        def profiled(*args, **kwargs):
+            part = cProfile.Profile()
+            try:
+                part.enable()
+            except ValueError:
+                return fn(*args, **kwargs)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                part.disable()
+                self.parts.append(part)
+        return profiled
+
+    def finish(self, elapsed, name):
+        self.request.disable()
+        if elapsed * 1000 < self.profiler.slow_ms:
+            return None
+        stats = pstats.Stats(self.request)
+        for part in self.parts:
+            stats.add(part)
+        os.makedirs(self.profiler.out_dir, exist_ok=True)
+        safe = "".join(c if c.isalnum() else "_" for c in name).strip("_") or "root"
+        path = os.path.join(self.profiler.out_dir,
+                            f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{safe}-{int(elapsed * 1000)}ms.prof")
+        stats.dump_stats(path)
+        self.profiler.dumped += 1
+        return path
+
+
+class SlowRequestProfiler:
+    def __init__(self, sample_rate=0.0, slow_ms=500.0, out_dir="profiles"):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.out_dir = out_dir
+        self.dumped = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(sample_rate=float(os.environ.get("CROP_PROFILE_SAMPLE", 0)),
+                   slow_ms=float(os.environ.get("CROP_PROFILE_SLOW_MS", 500)),
+                   out_dir=os.environ.get("CROP_PROFILE_DIR", "profiles"))
+
+    def start(self):
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return None
+        session = ProfileSession(self)
+        try:
+            session.request.enable()
+        except ValueError:
+            # another profiler is already active in this thread
+            return None
+        return session
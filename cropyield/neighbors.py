@@ -0,0 +1,112 @@
+import json
+import os
+
+import numpy as np
+
+from cropyield.forest import save_array, save_json
+
+FARM_INDEX_VERSION = 2
+# same order as predict.CROP_FEATURES / the crop_model columns
+FEATURES = ("N", "P", "K", "temperature", "humidity", "ph", "rainfall")
+# distances computed per block of queries: at most this many (query, record) pairs at once
+QUERY_BLOCK = 1 << 21
+
+
+# ----------------------
+# Similar farms (k nearest crop recommendation records)
+# ----------------------
+# The raw features of processed_crop_recommendation.csv (features.npy) and their crop
+# codes (labels.npy), standardised with the mean and scale in meta.json, built by
+# training/build_farm_index.py. Queries are an exact brute-force search in numpy (one
+# matrix product per block plus argpartition), so serving needs neither sklearn nor a
+# pickle; a few thousand records take well under a millisecond per farm.
+class FarmIndex:
+    def __init__(self, meta, features, labels):
+        self.meta = meta
+        self.mean = np.asarray(meta["mean"], dtype=np.float64)
+        self.scale = np.asarray(meta["scale"], dtype=np.float64)
+        self.classes = np.asarray(meta["classes"], dtype=object)
+        self.features = np.asarray(features, dtype=np.float64)
+        self.labels = np.asarray(labels, dtype=np.int32)
+        self._index()
+
+    def _index(self):
+        self.points = self.standardize(self.features)
+        self.norms = (self.points ** 2).sum(axis=1)
+
+    @classmethod
+    def build(cls, features, labels, meta=None):
+        features = np.asarray(features, dtype=np.float64)
+        classes, codes = np.unique([str(label).lower() for label in labels], return_inverse=True)
+        scale = features.std(axis=0)
+        meta = dict(meta or {}, version=FARM_INDEX_VERSION, features=list(FEATURES), classes=classes.tolist(),
+                    mean=features.mean(axis=0).tolist(), scale=np.where(scale > 0, scale, 1.0).tolist())
+        return cls(meta, features, codes)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != FARM_INDEX_VERSION:
+            raise ValueError(f"unsupported farm index version {meta.get('version')} in {path}; "
+                             f"rebuild it with training/build_farm_index.py")
+        features = np.load(os.path.join(path, "features.npy"), mmap_mode=mmap_mode)
+        labels = np.load(os.path.join(path, "labels.npy"))
+        return cls(meta, features, labels)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        save_array(os.path.join(path, "features.npy"), self.features)
+        save_array(os.path.join(path, "labels.npy"), self.labels)
+        # left over from the KD-tree layout (version 1)
+        for old in ("tree.pkl", "appended.npz"):
+            if os.path.exists(os.path.join(path, old)):
+                os.remove(os.path.join(path, old))
+        save_json(os.path.join(path, "meta.json"), self.meta)
+
+    def __len__(self):
+        return len(self.features)
+
+    def standardize(self, X):
+        return (np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURES)) - self.mean) / self.scale
+
+    def append(self, features, labels):
+        # new labelled records, standardised with the build's mean and scale
+        codes = self.encode_labels(labels)
+        self.features = np.vstack([self.features, np.asarray(features, dtype=np.float64)])
+        self.labels = np.concatenate([self.labels, codes])
+        self._index()
+        return self
+
+    def encode_labels(self, labels):
+        labels = [str(label).lower() for label in labels]
+        new = sorted(set(labels) - set(self.classes))
+        if new:
+            self.classes = np.append(self.classes, np.asarray(new, dtype=object))
+            self.meta["classes"] = self.classes.tolist()
+        lookup = {c: i for i, c in enumerate(self.classes)}
+        return np.array([lookup[label] for label in labels], dtype=np.int32)
+
+    def query(self, X, k=5):
+        # -> (distances, row ids) sorted nearest first
+        Z = self.standardize(X)
+        k = min(k, len(self))
+        dist, idx = np.zeros((len(Z), k)), np.zeros((len(Z), k), dtype=np.int64)
+        if not k:
+            return dist, idx
+        step = max(1, QUERY_BLOCK // len(self))
+        for start in range(0, len(Z), step):
+            z = Z[start:start + step]
+            # |z - p|^2 = |z|^2 - 2 z.p + |p|^2
+            d2 = (z ** 2).sum(axis=1)[:, None] - 2 * z @ self.points.T + self.norms[None, :]
+            near = np.argpartition(d2, k - 1, axis=1)[:, :k]
+            d2 = np.take_along_axis(d2, near, axis=1)
+            order = np.argsort(d2, axis=1, kind="stable")
+            dist[start:start + step] = np.sqrt(np.maximum(np.take_along_axis(d2, order, axis=1), 0))
+            idx[start:start + step] = np.take_along_axis(near, order, axis=1)
+        return dist, idx
+
+    def rows(self, idx):
+        # features and label names for row ids from query
+        idx = np.asarray(idx)
+        return self.features[idx], self.classes[self.labels[idx]]
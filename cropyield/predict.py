@@ -0,0 +1,227 @@
+import os
+
+import numpy as np
+
+from cropyield.metrics import metrics, timer
+from cropyield.records import from_inputs
+from cropyield.registry import registry
+from cropyield.yield_table import HIT, INTERPOLATED, MISS
+
+# yield_model predicts quintals/ha (the yield_kg_per_ha training column); results are in kg/ha
+YIELD_SCALE_FACTOR = 100.0
+# CROP_YIELD_TABLE: "off" (default) always runs the model; "exact" answers from the precomputed
+# table when the result is identical to the model's, "interpolate" also interpolates between area
+# grid points. Free-form areas rarely share a model cell with a grid point (0.3% of requests in the
+# production data), so the table only pays off for inputs on the grid (e.g. areas picked from a list).
+YIELD_TABLE_MODE = os.environ.get("CROP_YIELD_TABLE", "off")
+CROP_FEATURES = ("N", "P", "K", "temperature", "humidity", "ph", "rainfall")
+# CROP_NEIGHBORS: similar historical farms returned with each prediction (0 = none)
+NEIGHBORS = int(os.environ.get("CROP_NEIGHBORS", 5))
+
+
+# ----------------------
+# Helpers
+# ----------------------
+def safe_encode(encoder, value):
+    return encoder.encode(value)
+
+
+def encode_yield_input(state, district, crop_year, season, crop_str, area):
+    yield_encoders = registry.get("yield_encoders")
+    s = safe_encode(yield_encoders['state_name'], state)
+    d = safe_encode(yield_encoders['district_name'], district)
+    se = safe_encode(yield_encoders['season'], season)
+    crop_enc = safe_encode(yield_encoders['crop'], crop_str)
+    return [s, d, int(crop_year), se, crop_enc, float(area)]
+
+
+def compute_fert_gain(crop_str, fert_name):
+    return registry.get("fert_gain_table").lookup_name(crop_str, fert_name)
+
+
+def _diff_pct(final_yield_alt, final_yield_sel):
+    return ((final_yield_alt - final_yield_sel) / final_yield_sel) * 100 if final_yield_sel > 0 else 0
+
+
+def predict_yield(yield_X):
+    # precomputed table first (training/build_yield_table.py), the live model for the rest
+    table = registry.get("yield_table") if YIELD_TABLE_MODE != "off" else None
+    if table is None:
+        return registry.get("yield_model").predict(yield_X) * YIELD_SCALE_FACTOR
+    values, status = table.lookup(yield_X, interpolate=YIELD_TABLE_MODE == "interpolate")
+    missed = status == MISS
+    if missed.any():
+        values[missed] = registry.get("yield_model").predict(yield_X[missed])
+    for result, code in (("hit", HIT), ("interpolated", INTERPOLATED), ("miss", MISS)):
+        metrics.add("crop_yield_table_lookups_total", int((status == code).sum()), result=result)
+    return values * YIELD_SCALE_FACTOR
+
+
+def recommend_crops(records, top_k=1):
+    # Stage 1: crop recommender. Returns the top_k crop names for every farm, best first;
+    # the first one is always what crop_model.predict would return.
+    crop_model = registry.get("crop_model")
+    crop_label_encoder = registry.get("crop_label_encoder")
+    crop_X = np.column_stack([records[name] for name in CROP_FEATURES]).astype(float)
+    if top_k <= 1:
+        return [[c.lower()] for c in crop_label_encoder.decode_many(crop_model.predict(crop_X))]
+
+    proba = crop_model.predict_proba(crop_X)
+    order = np.argsort(-proba, axis=1, kind="stable")[:, :top_k]
+    labels = crop_label_encoder.decode_many(crop_model.classes_[order].ravel()).reshape(order.shape)
+    return [[c.lower() for c in row] for row in labels]
+
+
+def similar_farms(records, k=NEIGHBORS):
+    # the k nearest crop recommendation records by soil and weather, per farm;
+    # None when there is no farm index (training/build_farm_index.py)
+    index = registry.get("farm_index") if k > 0 else None
+    if index is None:
+        return None
+    dist, idx = index.query(np.column_stack([records[name] for name in CROP_FEATURES]), k)
+    features, labels = index.rows(idx)
+    return [[dict({"crop": str(labels[i, j]).capitalize(), "distance": round(float(dist[i, j]), 4)},
+                  **{name: round(float(features[i, j, f]), 2) for f, name in enumerate(CROP_FEATURES)})
+             for j in range(idx.shape[1])] for i in range(len(idx))]
+
+
+def score_candidates(records, candidates):
+    # Stage 2: yield + fertilizer for (farm index, crop) candidates, one stacked call per model.
+    yield_encoders = registry.get("yield_encoders")
+    fert_encoders = registry.get("fert_encoders")
+    rows = np.array([i for i, _ in candidates], dtype=np.int64)
+    crops = [c for _, c in candidates]
+
+    with timer("encode"):
+        yield_X = np.column_stack([
+            yield_encoders['state_name'].encode_many(records['state'])[rows],
+            yield_encoders['district_name'].encode_many(records['district'])[rows],
+            records['crop_year'][rows],
+            yield_encoders['season'].encode_many(records['season'])[rows],
+            yield_encoders['crop'].encode_many(crops),
+            records['area'][rows],
+        ]).astype(float)
+        farm_rows = records[rows]
+        fert_X = np.column_stack([
+            farm_rows['temperature'], farm_rows['humidity'], farm_rows['soil_moisture'],
+            fert_encoders['Soil Type'].encode_many(records['soil_type'])[rows],
+            fert_encoders['Crop Type'].encode_many(crops),
+            farm_rows['N'], farm_rows['K'], farm_rows['P'],
+        ]).astype(float)
+
+    with timer("yield"):
+        yields = predict_yield(yield_X)
+    with timer("fertilizer"):
+        fert_codes = registry.get("fert_model").predict(fert_X)
+    with timer("inverse_transform"):
+        fert_names = fert_encoders['Fertilizer Name'].decode_many(fert_codes)
+        fert_gains = registry.get("fert_gain_table").lookup_many(crops, fert_codes)
+
+    scored = []
+    for crop, crop_yield, fert_name, fert_gain in zip(crops, yields, fert_names, fert_gains):
+        scored.append({
+            "crop": crop,
+            "yield": crop_yield,
+            "fert_name": fert_name,
+            "fert_gain": fert_gain,
+            "final_yield": crop_yield * (1 + fert_gain)
+        })
+    return scored
+
+
+def build_inputs(fields):
+    # fields: the form, a JSON record or a CSV row with the same names as templates/index.html.
+    # The dict form predict_crop takes; new code should use cropyield.records.parse_records.
+    crop_year = int(fields["crop_year"])
+    area = float(fields["area"])
+    temperature = float(fields["temperature"])
+    humidity = float(fields["humidity"])
+    soil_moisture = float(fields["soil_moisture"])
+    selected_crop = fields.get("crop")
+
+    farm = {
+        "state": fields["state"], "district": fields["district"],
+        "crop_year": crop_year, "season": fields["season"],
+        "area": area
+    }
+
+    soil_weather = {
+        "N": int(fields["N"]), "P": int(fields["P"]), "K": int(fields["K"]),
+        "temperature": temperature, "humidity": humidity,
+        "ph": float(fields["ph"]), "rainfall": float(fields["rainfall"]),
+        "Temperature": temperature, "Humidity": humidity, "Soil Moisture": soil_moisture,
+        "Soil Type": fields["soil_type"], "Crop Type": selected_crop
+    }
+    return farm, soil_weather, selected_crop
+
+
+def predict_crop(farm_meta, soil_weather, selected_crop, top_k=1):
+    return predict_crop_batch([(farm_meta, soil_weather, selected_crop)], top_k=top_k)[0]
+
+
+def predict_crop_batch(farms, top_k=1):
+    # farms: a FARM_DTYPE array from cropyield.records.parse_records, or a list of
+    # (farm_meta, soil_weather, selected_crop) tuples, the same arguments as predict_crop.
+    # The crop recommender runs first, then the selected and recommended crops of every
+    # farm (deduplicated) go through the yield and fertilizer models together.
+    # With top_k > 1 the next best crops from predict_proba are scored in the same pass.
+    # Every result names the artifact release (model_version) that produced it.
+    if len(farms) == 0:
+        return []
+    if not isinstance(farms, np.ndarray):
+        with timer("normalize"):
+            farms = from_inputs(farms)
+    with registry.pin() as version:
+        return _predict_records(farms, top_k, version)
+
+
+def _predict_records(farms, top_k, version):
+    selected = farms["crop"]
+
+    with timer("crop"):
+        recommended = recommend_crops(farms, top_k)
+    with timer("neighbors"):
+        neighbors = similar_farms(farms)
+
+    candidates, slots = [], {}
+    for i, crops in enumerate(recommended):
+        for crop in [selected[i]] + crops:
+            if (i, crop) not in slots:
+                slots[(i, crop)] = len(candidates)
+                candidates.append((i, crop))
+    scored = score_candidates(farms, candidates)
+
+    with timer("assemble"):
+        results = []
+        for i, crops in enumerate(recommended):
+            sel = scored[slots[(i, selected[i])]]
+            alts = [scored[slots[(i, c)]] for c in crops]
+            alt = alts[0]
+
+            result = {
+                "selected_crop": selected[i].capitalize(),
+                "sel_yield": round(float(sel["yield"]), 2),
+                "fert_name_sel": sel["fert_name"],
+                "fert_gain_sel": round(float(sel["fert_gain"] * 100), 2),
+                "final_yield_sel": round(float(sel["final_yield"]), 2),
+                "alt_crop": alt["crop"].capitalize(),
+                "alt_yield": round(float(alt["yield"]), 2),
+                "fert_name_alt": alt["fert_name"],
+                "fert_gain_alt": round(float(alt["fert_gain"] * 100), 2),
+                "final_yield_alt": round(float(alt["final_yield"]), 2),
+                "diff_pct_alt": round(float(_diff_pct(alt["final_yield"], sel["final_yield"])), 2),
+                "model_version": version
+            }
+            if top_k > 1:
+                result["alternatives"] = [{
+                    "crop": a["crop"].capitalize(),
+                    "yield": round(float(a["yield"]), 2),
+                    "fert_name": a["fert_name"],
+                    "fert_gain": round(float(a["fert_gain"] * 100), 2),
+                    "final_yield": round(float(a["final_yield"]), 2),
+                    "diff_pct": round(float(_diff_pct(a["final_yield"], sel["final_yield"])), 2)
+                } for a in alts]
+            if neighbors is not None:
+                result["similar_farms"] = neighbors[i]
+            results.append(result)
+    return results
@@ -0,0 +1,125 @@
+import numpy as np
+
+# ----------------------
+# Typed farm records
+# ----------------------
+# One row per farm, the same fields as templates/index.html. Parsed and checked
+# once per request, then fed column by column to the feature builders in predict.py.
+# Text fields are stored lowercased, the way the models are queried.
+FARM_DTYPE = np.dtype([
+    ("state", object), ("district", object), ("crop_year", np.int64), ("season", object), ("area", np.float64),
+    ("N", np.int64), ("P", np.int64), ("K", np.int64), ("temperature", np.float64), ("humidity", np.float64),
+    ("ph", np.float64), ("rainfall", np.float64), ("soil_moisture", np.float64), ("soil_type", object),
+    ("crop", object),
+])
+FIELDS = FARM_DTYPE.names
+# physically possible values; anything outside is a typo or a unit mix-up
+RANGES = {"N": (0, 1000), "P": (0, 1000), "K": (0, 1000), "humidity": (0, 100), "ph": (0, 14)}
+
+
+class RecordError(ValueError):
+    def __init__(self, row, field, message):
+        super().__init__(f"row {row}, {field}: {message}")
+        self.row = row
+        self.field = field
+
+
+def _columns(records, columns=None):
+    # records: a DataFrame, mappings (form data, JSON objects) or sequences in `columns` order
+    if hasattr(records, "iloc"):
+        return {name: records[name].to_numpy(dtype=object) for name in FIELDS if name in records.columns}
+    if len(records) and isinstance(records[0], (list, tuple)):
+        names = tuple(columns or FIELDS)
+        if any(len(row) != len(names) for row in records):
+            raise ValueError(f"every row needs {len(names)} values: {', '.join(names)}")
+        table = np.empty((len(records), len(names)), dtype=object)
+        table[:] = records
+        return {name: table[:, j] for j, name in enumerate(names)}
+    present = {}
+    for name in FIELDS:
+        try:
+            present[name] = [record[name] for record in records]
+        except KeyError:
+            # only some rows have it; reported per row below
+            present[name] = [record.get(name) if hasattr(record, "get") else None for record in records]
+            if all(value is None for value in present[name]):
+                del present[name]
+    return present
+
+
+def _cast(values, dtype, name, errors):
+    # vectorised int()/float(); falls back to one value at a time to find the bad rows
+    values = np.asarray(values, dtype=object)
+    try:
+        out = values.astype(dtype)
+        if dtype.kind == "f":
+            for i in np.flatnonzero(np.isnan(out)):
+                if values[i] is None:
+                    errors.setdefault(int(i), (name, "missing"))
+        return out
+    except (TypeError, ValueError):
+        pass
+    cast = int if dtype.kind == "i" else float
+    out = np.zeros(len(values), dtype=dtype)
+    for i, value in enumerate(values):
+        try:
+            out[i] = cast(value)
+        except (TypeError, ValueError, OverflowError):
+            kind = "an integer" if dtype.kind == "i" else "a number"
+            errors.setdefault(i, (name, "missing" if value is None else f"{value!r} is not {kind}"))
+    return out
+
+
+def _parse(columns, n):
+    out = np.zeros(n, dtype=FARM_DTYPE)
+    errors = {}
+    for name in FIELDS:
+        if name not in columns:
+            for i in range(n):
+                errors.setdefault(i, (name, "missing"))
+            continue
+        values = columns[name]
+        if FARM_DTYPE[name].kind == "O":
+            column = np.empty(n, dtype=object)
+            for i, value in enumerate(values):
+                if value is None or (name == "crop" and value == ""):
+                    errors.setdefault(i, (name, "missing"))
+                    column[i] = ""
+                else:
+                    column[i] = str(value).lower()
+            out[name] = column
+        else:
+            out[name] = _cast(values, FARM_DTYPE[name], name, errors)
+    for name, (lo, hi) in RANGES.items():
+        column = out[name]
+        for i in np.flatnonzero(~((column >= lo) & (column <= hi))):
+            errors.setdefault(int(i), (name, f"{column[i]} outside {lo}-{hi}"))
+    return out, errors
+
+
+def parse_records(records, columns=None, skip_invalid=False):
+    # -> FARM_DTYPE array; raises RecordError for the first bad row.
+    # With skip_invalid=True -> (array of the valid rows, their indices, {row: message}).
+    n = len(records)
+    out, errors = _parse(_columns(records, columns), n)
+    if not skip_invalid:
+        if errors:
+            row = min(errors)
+            raise RecordError(row, *errors[row])
+        return out
+    valid = np.setdiff1d(np.arange(n), np.fromiter(errors, dtype=np.int64, count=len(errors)))
+    messages = {row: f"{field}: {message}" for row, (field, message) in errors.items()}
+    return out[valid], valid, messages
+
+
+def parse_record(fields):
+    # a single form / JSON object -> one-row array
+    return parse_records([fields])
+
+
+def from_inputs(farms):
+    # (farm_meta, soil_weather, selected_crop) tuples, as built by build_inputs
+    return parse_records([dict(farm_meta, N=soil["N"], P=soil["P"], K=soil["K"], temperature=soil["temperature"],
+                               humidity=soil["humidity"], ph=soil["ph"], rainfall=soil["rainfall"],
+                               soil_moisture=soil["Soil Moisture"], soil_type=soil["Soil Type"], crop=crop)
+                          for farm_meta, soil, crop in farms])
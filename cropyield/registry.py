@@ -0,0 +1,336 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import joblib
+
+from cropyield import releases
+from cropyield.encoding import compile_encoders
+from cropyield.fert_gain import FertGainTable
+from cropyield.forest import CompiledForest
+from cropyield.neighbors import FarmIndex
+from cropyield.yield_table import YieldTable
+
+logger = logging.getLogger(__name__)
+
+# CROP_ARTIFACT_DIR overrides where models/ and encoders/ are read from
+DEFAULT_ARTIFACT_DIR = os.environ.get(
+    "CROP_ARTIFACT_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+MODEL_FILES = {
+    "yield_model": os.path.join("models", "yield_model.pkl"),
+    "crop_model": os.path.join("models", "crop_model.pkl"),
+    "fert_model": os.path.join("models", "fertilizer_model.pkl"),
+}
+ENCODER_FILES = {
+    "yield_encoders": os.path.join("encoders", "yield_encoders.pkl"),
+    "crop_label_encoder": os.path.join("encoders", "crop_label_encoder.pkl"),
+    "fert_encoders": os.path.join("encoders", "fertilizer_encoders.pkl"),
+}
+FERT_GAIN_FILE = os.path.join("encoders", "fert_gain_table.npz")
+LEGACY_FERT_GAIN_FILE = os.path.join("encoders", "fert_gain_table.json")
+# written by training/export_models.py; preferred over the pickles while they are up to date
+COMPILED_DIR = os.path.join("models", "compiled")
+COMPILED_ENCODERS_FILE = os.path.join(COMPILED_DIR, "encoders.json")
+# written by training/build_yield_table.py; ignored once yield_model changes
+YIELD_TABLE_DIR = os.path.join("models", "yield_table")
+# written by training/build_farm_index.py; optional
+FARM_INDEX_DIR = os.path.join("models", "farm_index")
+# everything a release (cropyield/releases.py) freezes together
+RELEASE_ITEMS = (list(MODEL_FILES.values()) + list(ENCODER_FILES.values())
+                 + [FERT_GAIN_FILE, LEGACY_FERT_GAIN_FILE, COMPILED_DIR, YIELD_TABLE_DIR, FARM_INDEX_DIR])
+
+
+def file_fingerprint(path):
+    # cheap staleness check for compiled artifacts: size + mtime of the source pickle
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+# ----------------------
+# Lazy model registry
+# ----------------------
+# Nothing is read at import time; each artifact is loaded on first use.
+# Models are opened with mmap_mode="r" so the numpy arrays of uncompressed
+# joblib dumps are mapped from the page cache instead of read into the heap.
+# When compiled forests exist (training/export_models.py) they are used instead:
+# their packed arrays stay mapped and sklearn is never imported.
+class ModelRegistry:
+    def __init__(self, artifact_dir=None, mmap_mode="r", use_compiled=None):
+        self.artifact_dir = artifact_dir or DEFAULT_ARTIFACT_DIR
+        self.mmap_mode = mmap_mode
+        if use_compiled is None:
+            use_compiled = os.environ.get("CROP_USE_COMPILED", "1") != "0"
+        self.use_compiled = use_compiled
+        self._artifacts = {}
+        self._timings = {}
+        self._lock = threading.RLock()
+
+    def path(self, name):
+        if name in MODEL_FILES:
+            return os.path.join(self.artifact_dir, MODEL_FILES[name])
+        if name in ENCODER_FILES:
+            return os.path.join(self.artifact_dir, ENCODER_FILES[name])
+        if name == "fert_gain_table":
+            return os.path.join(self.artifact_dir, FERT_GAIN_FILE)
+        if name == "yield_table":
+            return os.path.join(self.artifact_dir, YIELD_TABLE_DIR)
+        if name == "farm_index":
+            return os.path.join(self.artifact_dir, FARM_INDEX_DIR)
+        raise KeyError(f"unknown artifact: {name}")
+
+    def compiled_path(self, name):
+        stem = os.path.splitext(os.path.basename(MODEL_FILES[name]))[0]
+        return os.path.join(self.artifact_dir, COMPILED_DIR, stem)
+
+    def get(self, name):
+        if name in self._artifacts:
+            return self._artifacts[name]
+        with self._lock:
+            if name not in self._artifacts:
+                start = time.perf_counter()
+                self._artifacts[name] = self._load(name)
+                self._timings[name] = time.perf_counter() - start
+                logger.info("loaded %s in %.3fs", name, self._timings[name])
+            return self._artifacts[name]
+
+    def _load(self, name):
+        path = self.path(name)
+        if name in MODEL_FILES:
+            compiled = self._load_compiled_model(name, path)
+            if compiled is not None:
+                return compiled
+            return joblib.load(path, mmap_mode=self.mmap_mode)
+        if name in ENCODER_FILES:
+            classes = self._load_compiled_classes(name, path)
+            if classes is not None:
+                return compile_encoders(classes)
+            return compile_encoders(joblib.load(path))
+        if name == "yield_table":
+            return self._load_yield_table(path)
+        if name == "farm_index":
+            return self._load_farm_index(path)
+        return self._load_gain_table(path)
+
+    def _load_compiled_model(self, name, source):
+        compiled = self.compiled_path(name)
+        if not self.use_compiled or not os.path.exists(os.path.join(compiled, "meta.json")):
+            return None
+        forest = CompiledForest.load(compiled, mmap_mode=self.mmap_mode)
+        if os.path.exists(source) and forest.meta.get("source") != file_fingerprint(source):
+            logger.warning("compiled %s is older than %s, using the pickle", name, source)
+            return None
+        return forest
+
+    def _load_compiled_classes(self, name, source):
+        path = os.path.join(self.artifact_dir, COMPILED_ENCODERS_FILE)
+        if not self.use_compiled or not os.path.exists(path):
+            return None
+        with open(path) as f:
+            exported = json.load(f)
+        if name not in exported["classes"]:
+            return None
+        if os.path.exists(source) and exported["sources"].get(name) != file_fingerprint(source):
+            logger.warning("compiled %s is older than %s, using the pickle", name, source)
+            return None
+        return exported["classes"][name]
+
+    def _load_gain_table(self, path):
+        fertilizers = self.get("fert_encoders")["Fertilizer Name"].classes
+        if os.path.exists(path):
+            return FertGainTable.load(path).align(fertilizers)
+        legacy = os.path.join(self.artifact_dir, LEGACY_FERT_GAIN_FILE)
+        if os.path.exists(legacy):
+            with open(legacy) as f:
+                return FertGainTable.from_dict(json.load(f), fertilizers)
+        return FertGainTable.empty(fertilizers)
+
+    def _load_yield_table(self, path):
+        # optional: None when missing or built from another yield_model
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        table = YieldTable.load(path, mmap_mode=self.mmap_mode)
+        model = self.path("yield_model")
+        if os.path.exists(model) and table.meta.get("model") != file_fingerprint(model):
+            logger.warning("yield table in %s was built for another yield_model, ignoring it", path)
+            return None
+        return table
+
+    def _load_farm_index(self, path):
+        # optional: None until training/build_farm_index.py has run, or when it was built
+        # in an older layout (predictions then leave out similar_farms)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        try:
+            return FarmIndex.load(path, mmap_mode=self.mmap_mode)
+        except ValueError as e:
+            logger.warning("%s (serving without similar farms)", e)
+            return None
+
+    def load_all(self):
+        for name in list(MODEL_FILES) + list(ENCODER_FILES) + ["fert_gain_table", "yield_table", "farm_index"]:
+            self.get(name)
+        return self
+
+    def is_loaded(self, name):
+        return name in self._artifacts
+
+    def timings(self):
+        return {name: round(seconds, 4) for name, seconds in self._timings.items()}
+
+
+# ----------------------
+# Serving registry with hot swaps
+# ----------------------
+# Serves artifact_dir as is until a release store exists (training/release.py);
+# then it serves releases/<CURRENT>, verified against its manifest when first used
+# (not at import, so training CLIs never hash the store). A watcher thread in each
+# worker process notices a new CURRENT, loads and verifies that version in the
+# background and swaps it in. A release that fails verification is not hashed again
+# until CURRENT is rewritten; if it is the one CURRENT names at startup, the newest
+# release that verifies is served instead, never the working (maybe half-written) tree.
+# predict_crop_batch pins one version for its whole run, so a request never mixes
+# the models of two versions and in-flight requests finish on the version they began with.
+class VersionedRegistry:
+    def __init__(self, artifact_dir=None, **options):
+        self.root = artifact_dir or DEFAULT_ARTIFACT_DIR
+        self._options = options
+        self._pinned = threading.local()
+        self._swap_lock = threading.Lock()
+        self._watch_lock = threading.Lock()
+        self._watcher_pid = None
+        self.swaps = 0
+        # (version, CURRENT mtime) pairs that failed verification
+        self._rejected = set()
+        self._current = None
+
+    def _open(self, version):
+        loaded = ModelRegistry(releases.release_dir(self.root, version) if version else self.root, **self._options)
+        loaded.version = version or "local"
+        return loaded
+
+    def _verified(self, version):
+        # -> the release, checked against its manifest, or None
+        key = (version, releases.current_mtime(self.root))
+        if key in self._rejected:
+            return None
+        candidate = self._open(version)
+        problems = releases.verify(candidate.artifact_dir)
+        if problems:
+            self._rejected.add(key)
+            logger.error("not serving release %s: %s", version, "; ".join(problems))
+            return None
+        return candidate
+
+    def _newest_verified(self, version):
+        # CURRENT's release, else the most recently published one that passes verification
+        for candidate in [version] + [v for v in reversed(releases.list_releases(self.root)) if v != version]:
+            found = self._verified(candidate)
+            if found is not None:
+                if candidate != version:
+                    logger.error("release %s failed verification, serving %s instead", version, candidate)
+                return found
+        raise RuntimeError(f"no release in {self.root} passes verification")
+
+    def _serving(self):
+        if self._current is None:
+            with self._swap_lock:
+                if self._current is None:
+                    version = releases.current_version(self.root)
+                    self._current = self._newest_verified(version) if version else self._open(None)
+        return self._current
+
+    @property
+    def active(self):
+        return getattr(self._pinned, "registry", None) or self._serving()
+
+    @property
+    def version(self):
+        return self.active.version
+
+    @property
+    def artifact_dir(self):
+        return self.active.artifact_dir
+
+    def get(self, name):
+        return self.active.get(name)
+
+    def path(self, name):
+        return self.active.path(name)
+
+    def compiled_path(self, name):
+        return self.active.compiled_path(name)
+
+    def is_loaded(self, name):
+        return self.active.is_loaded(name)
+
+    def timings(self):
+        return self.active.timings()
+
+    def load_all(self):
+        self.active.load_all()
+        return self
+
+    @contextmanager
+    def pin(self):
+        pinned = getattr(self._pinned, "registry", None)
+        if pinned is not None:
+            yield pinned.version
+            return
+        self._pinned.registry = self._serving()
+        try:
+            yield self._pinned.registry.version
+        finally:
+            self._pinned.registry = None
+
+    def reload(self, version=None):
+        # load `version` (default: releases/CURRENT) fully, then swap; the old one keeps
+        # serving until then, and stays alive for requests still pinned to it
+        version = version or releases.current_version(self.root)
+        self._serving()
+        with self._swap_lock:
+            if version == self._current.version or (version is None and self._current.version == "local"):
+                return False
+            start = time.perf_counter()
+            candidate = self._verified(version) if version is not None else self._open(None)
+            if candidate is None:
+                return False
+            candidate.load_all()
+            self._current = candidate
+            self.swaps += 1
+            logger.warning("now serving release %s (loaded in %.2fs)", candidate.version, time.perf_counter() - start)
+            return True
+
+    def watch(self, interval):
+        # one watcher per process; safe to call on every request (threads don't survive fork)
+        if interval <= 0 or self._watcher_pid == os.getpid():
+            return
+        with self._watch_lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if releases.current_version(self.root) != self._serving().version:
+                        self.reload()
+                except Exception:
+                    logger.exception("release reload failed")
+
+        threading.Thread(target=loop, name="release-watcher", daemon=True).start()
+
+    def status(self):
+        return {"version": self._serving().version, "current": releases.current_version(self.root),
+                "swaps": self.swaps, "root": self.root,
+                "available": releases.list_releases(self.root)}
+
+
+registry = VersionedRegistry()
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+
+RELEASES_DIR = "releases"
+CURRENT_FILE = os.path.join(RELEASES_DIR, "CURRENT")
+HISTORY_FILE = os.path.join(RELEASES_DIR, "history.json")
+MANIFEST_NAME = "manifest.json"
+
+
+# ----------------------
+# Versioned artifact store
+# ----------------------
+# releases/<version>/ is a frozen copy of every serving artifact plus a manifest of
+# their sha256 hashes, so a model always travels with the encoders and tables it was
+# trained with. releases/CURRENT names the version workers should serve; it is
+# replaced atomically, and releases are never modified once published.
+def sha256_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def release_dir(artifact_dir, version):
+    return os.path.join(artifact_dir, RELEASES_DIR, version)
+
+
+def _files(root, items):
+    # items are files or directories relative to root; missing ones are optional artifacts
+    for item in items:
+        path = os.path.join(root, item)
+        if os.path.isdir(path):
+            for dirpath, _, names in os.walk(path):
+                for name in sorted(names):
+                    yield os.path.relpath(os.path.join(dirpath, name), root)
+        elif os.path.exists(path):
+            yield item
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST_NAME)) as f:
+        return json.load(f)
+
+
+def verify(path):
+    # -> list of problems; empty when every file matches its manifest hash
+    try:
+        manifest = read_manifest(path)
+    except (OSError, ValueError) as e:
+        return [f"unreadable manifest: {e}"]
+    problems = []
+    for rel, expected in manifest["files"].items():
+        file = os.path.join(path, rel)
+        if not os.path.exists(file):
+            problems.append(f"missing {rel}")
+        elif sha256_file(file) != expected:
+            problems.append(f"hash mismatch {rel}")
+    return problems
+
+
+def list_releases(artifact_dir):
+    root = os.path.join(artifact_dir, RELEASES_DIR)
+    if not os.path.isdir(root):
+        return []
+    found = [v for v in os.listdir(root) if os.path.exists(os.path.join(root, v, MANIFEST_NAME))]
+    return sorted(found, key=lambda v: read_manifest(release_dir(artifact_dir, v))["created"])
+
+
+def current_version(artifact_dir):
+    try:
+        with open(os.path.join(artifact_dir, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def current_mtime(artifact_dir):
+    # changes with every activate/rollback, even back to the same version
+    try:
+        return os.stat(os.path.join(artifact_dir, CURRENT_FILE)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def publish(artifact_dir, items, version=None, activate_it=True, info=None):
+    # copy the working artifacts into a new release (staged, then renamed into place)
+    files = {rel: sha256_file(os.path.join(artifact_dir, rel)) for rel in _files(artifact_dir, items)}
+    if not files:
+        raise FileNotFoundError(f"no artifacts found under {artifact_dir}")
+    content = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+
+    for existing in list_releases(artifact_dir):
+        if read_manifest(release_dir(artifact_dir, existing)).get("content") == content:
+            if activate_it:
+                activate(artifact_dir, existing)
+            return read_manifest(release_dir(artifact_dir, existing)), False
+
+    version = version or f"{time.strftime('%Y%m%d-%H%M%S')}-{content[:8]}"
+    target = release_dir(artifact_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"release {version} already exists")
+    staging = os.path.join(artifact_dir, RELEASES_DIR, f".staging-{version}-{os.getpid()}")
+    try:
+        for rel in files:
+            os.makedirs(os.path.dirname(os.path.join(staging, rel)), exist_ok=True)
+            # copy2 keeps mtimes, which the compiled-artifact staleness checks compare
+            shutil.copy2(os.path.join(artifact_dir, rel), os.path.join(staging, rel))
+        manifest = {"version": version, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "content": content,
+                    "files": files, "info": info or {}}
+        with open(os.path.join(staging, MANIFEST_NAME), "w") as f:
+            json.dump(manifest, f, indent=2)
+        problems = verify(staging)
+        if problems:
+            raise IOError(f"artifacts changed while publishing: {', '.join(problems)}")
+        os.rename(staging, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    if activate_it:
+        activate(artifact_dir, version)
+    return manifest, True
+
+
+def activate(artifact_dir, version, is_rollback=False):
+    if not os.path.exists(os.path.join(release_dir(artifact_dir, version), MANIFEST_NAME)):
+        raise KeyError(f"unknown release {version}")
+    history = read_history(artifact_dir)
+    if history and history[-1]["version"] == version and current_version(artifact_dir) == version:
+        return
+    entry = {"version": version, "activated_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    if is_rollback:
+        entry["rollback"] = True
+    history.append(entry)
+    _write_atomic(os.path.join(artifact_dir, HISTORY_FILE), json.dumps(history, indent=2))
+    _write_atomic(os.path.join(artifact_dir, CURRENT_FILE), version + "\n")
+
+
+def read_history(artifact_dir):
+    try:
+        with open(os.path.join(artifact_dir, HISTORY_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def _active_stack(history):
+    # activations push a version, rollbacks pop back to the one below
+    stack = []
+    for entry in history:
+        if entry.get("rollback") and len(stack) > 1 and stack[-2] == entry["version"]:
+            stack.pop()
+        else:
+            stack.append(entry["version"])
+    return stack
+
+
+def rollback(artifact_dir, to=None):
+    # back to `to`, or to the version that was active before the current one
+    if to is None:
+        stack = _active_stack(read_history(artifact_dir))
+        if len(stack) < 2:
+            raise KeyError("no earlier release to roll back to")
+        to = stack[-2]
+    activate(artifact_dir, to, is_rollback=True)
+    return to
@@ -0,0 +1,88 @@
+import gzip
+import hashlib
+import time
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# bodies smaller than this go out as they are
+MIN_COMPRESS_BYTES = 512
+COMPRESSIBLE = ("text/html", "text/plain", "text/css", "application/json", "application/javascript")
+
+
+# ----------------------
+# Compressed representations
+# ----------------------
+# A body encoded once per encoding (brotli when the brotli package is installed, gzip,
+# identity), each with its own strong ETag. Static pages use the slowest, smallest
+# settings since they are compressed once per process; fragments use faster ones.
+def encode_variants(body, static=True):
+    variants = {"identity": body}
+    if len(body) >= MIN_COMPRESS_BYTES:
+        variants["gzip"] = gzip.compress(body, compresslevel=9 if static else 6, mtime=0)
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=11 if static else 5)
+    return variants
+
+
+def choose_encoding(accept_encodings, available):
+    # br before gzip when the client takes both; identity otherwise
+    for encoding in ("br", "gzip"):
+        if encoding in available and accept_encodings.quality(encoding) > 0:
+            return encoding
+    return "identity"
+
+
+class Representation:
+    def __init__(self, body, mimetype="text/html", last_modified=None, static=True):
+        self.mimetype = mimetype
+        self.last_modified = int(last_modified or time.time())
+        self.variants = encode_variants(body, static)
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.etags = {encoding: digest if encoding == "identity" else f"{digest}-{encoding}"
+                      for encoding in self.variants}
+
+    def __len__(self):
+        return len(self.variants["identity"])
+
+    def not_modified(self, request):
+        if request.if_none_match:
+            return any(request.if_none_match.contains_weak(tag) for tag in self.etags.values())
+        since = request.if_modified_since
+        return since is not None and since.timestamp() >= self.last_modified
+
+    def respond(self, request, response_class, cache_control):
+        encoding = choose_encoding(request.accept_encodings, self.variants)
+        if self.not_modified(request):
+            response = response_class(status=304)
+        else:
+            response = response_class(self.variants[encoding], mimetype=self.mimetype)
+            if encoding != "identity":
+                response.headers["Content-Encoding"] = encoding
+        response.set_etag(self.etags[encoding])
+        response.last_modified = self.last_modified
+        response.headers["Cache-Control"] = cache_control
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+def compress_response(response, accept_encodings):
+    # on-the-fly gzip/brotli for everything not already encoded (JSON API results, /metrics)
+    if (response.direct_passthrough or response.status_code in (204, 304) or response.status_code < 200
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+    encoding = choose_encoding(accept_encodings, ("br", "gzip") if brotli is not None else ("gzip",))
+    if encoding == "gzip":
+        response.set_data(gzip.compress(body, compresslevel=6, mtime=0))
+    elif encoding == "br":
+        response.set_data(brotli.compress(body, quality=5))
+    else:
+        return response
+    response.headers["Content-Encoding"] = encoding
+    return response
@@ -0,0 +1,153 @@
+import numpy as np
+
+from cropyield.metrics import timer
+from cropyield.predict import _diff_pct, predict_yield
+from cropyield.records import RANGES
+from cropyield.registry import registry
+
+# grid axes a scenario request may sweep; the soil ones also feed the crop recommender
+SWEEPABLE = ("crop", "season", "N", "P", "K", "rainfall")
+NUMERIC_AXES = ("N", "P", "K", "rainfall")
+SORT_KEYS = ("final_yield", "yield", "fert_gain")
+
+
+# ----------------------
+# Grid expansion
+# ----------------------
+def axis_values(name, spec):
+    # spec: a list of values, {"start", "stop", "step"} (stop included) or "all" for crop/season
+    if spec == "all" and name == "crop":
+        return [str(c) for c in registry.get("yield_encoders")["crop"].classes]
+    if spec == "all" and name == "season":
+        return [str(c) for c in registry.get("yield_encoders")["season"].classes]
+    if isinstance(spec, dict):
+        if name not in NUMERIC_AXES:
+            raise ValueError(f"{name} takes a list of values, not a range")
+        start, stop, step = float(spec["start"]), float(spec["stop"]), float(spec.get("step", 1))
+        if step <= 0:
+            raise ValueError(f"{name}: step must be positive")
+        values = np.round(np.arange(start, stop + step / 2, step), 6).tolist()
+    elif isinstance(spec, (list, tuple)):
+        values = list(spec)
+    else:
+        raise ValueError(f"{name}: expected a list, a range or \"all\"")
+    if not values:
+        raise ValueError(f"{name}: no values to sweep")
+    if name not in NUMERIC_AXES:
+        return [str(v) for v in values]
+    values = [float(v) for v in values]
+    lo, hi = RANGES.get(name, (-np.inf, np.inf))
+    if min(values) < lo or max(values) > hi:
+        raise ValueError(f"{name}: values must be within {lo}-{hi}")
+    return values
+
+
+def expand_grid(grid):
+    unknown = set(grid) - set(SWEEPABLE)
+    if unknown:
+        raise ValueError(f"can't sweep {', '.join(sorted(unknown))}; choose from {', '.join(SWEEPABLE)}")
+    axes = [(name, axis_values(name, grid[name])) for name in SWEEPABLE if name in grid]
+    shape = [len(values) for _, values in axes]
+    idx = np.indices(shape).reshape(len(axes), -1) if axes else np.zeros((0, 1), dtype=np.int64)
+    return axes, idx
+
+
+def scenario_count(grid):
+    return expand_grid(grid)[1].shape[1]
+
+
+def _column(axes, idx, name, base, transform):
+    # transform runs once over the distinct values of an axis (plus the base value),
+    # and the result is broadcast to every scenario; the base value goes in the last row
+    for a, (axis, values) in enumerate(axes):
+        if axis == name:
+            return transform(list(values) + [base])[np.append(idx[a], len(values))]
+    return np.repeat(transform([base]), idx.shape[1] + 1)
+
+
+# ----------------------
+# Scoring
+# ----------------------
+def run_scenarios(farm, grid, sort_by="final_yield", limit=None):
+    # Score every combination of the grid for one farm (a parse_record row): one feature
+    # matrix per model, one predict call each. Values not in the grid are the farm's own.
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"sort_by must be one of {', '.join(SORT_KEYS)}")
+    if isinstance(farm, np.ndarray):
+        farm = farm[0]
+    with registry.pin() as version:
+        result = _score_grid(farm, grid, sort_by, limit)
+    result["model_version"] = version
+    return result
+
+
+def _score_grid(farm, grid, sort_by, limit):
+    with timer("scenario_expand"):
+        axes, idx = expand_grid(grid)
+
+        yield_encoders = registry.get("yield_encoders")
+        fert_encoders = registry.get("fert_encoders")
+        text = lambda values: np.array([str(v).lower() for v in values], dtype=object)
+        number = lambda values: np.asarray(values, dtype=float)
+        encode = lambda encoder: (lambda values: encoder.encode_many([str(v).lower() for v in values]))
+        n = idx.shape[1] + 1
+
+        crops = _column(axes, idx, "crop", farm["crop"], text)
+        soil_cols = {name: _column(axes, idx, name, farm[name], number) for name in NUMERIC_AXES}
+        constant = lambda value: np.full(n, float(value))
+
+        crop_X = np.column_stack([soil_cols["N"], soil_cols["P"], soil_cols["K"], constant(farm["temperature"]),
+                                  constant(farm["humidity"]), constant(farm["ph"]), soil_cols["rainfall"]])
+        yield_X = np.column_stack([
+            constant(yield_encoders['state_name'].encode(farm['state'])),
+            constant(yield_encoders['district_name'].encode(farm['district'])),
+            constant(farm['crop_year']),
+            _column(axes, idx, "season", farm['season'], encode(yield_encoders['season'])),
+            _column(axes, idx, "crop", farm['crop'], encode(yield_encoders['crop'])),
+            constant(farm['area']),
+        ]).astype(float)
+        fert_X = np.column_stack([
+            constant(farm['temperature']), constant(farm['humidity']), constant(farm['soil_moisture']),
+            constant(fert_encoders['Soil Type'].encode(farm['soil_type'])),
+            _column(axes, idx, "crop", farm['crop'], encode(fert_encoders['Crop Type'])),
+            soil_cols["N"], soil_cols["K"], soil_cols["P"],
+        ])
+
+    with timer("crop"):
+        # only the distinct soil rows go through the recommender
+        soil_rows, inverse = np.unique(crop_X, axis=0, return_inverse=True)
+        recommended = registry.get("crop_label_encoder").decode_many(
+            registry.get("crop_model").predict(soil_rows))[inverse.ravel()]
+    with timer("yield"):
+        yields = predict_yield(yield_X)
+    with timer("fertilizer"):
+        # the fertilizer model doesn't see the season, so season sweeps repeat its rows
+        fert_rows, inverse = np.unique(fert_X, axis=0, return_inverse=True)
+        fert_codes = registry.get("fert_model").predict(fert_rows)[inverse.ravel()]
+    with timer("inverse_transform"):
+        fert_names = fert_encoders['Fertilizer Name'].decode_many(fert_codes)
+        fert_gains = registry.get("fert_gain_table").lookup_many(crops, fert_codes)
+    final_yields = yields * (1 + fert_gains)
+
+    with timer("assemble"):
+        ranked = {"final_yield": final_yields, "yield": yields, "fert_gain": fert_gains}[sort_by][:-1]
+        order = np.argsort(-ranked, kind="stable")[:limit]
+        base_final = final_yields[-1]
+
+        def row(i):
+            return {
+                "crop": str(crops[i]).capitalize(),
+                "yield": round(float(yields[i]), 2),
+                "fert_name": fert_names[i],
+                "fert_gain": round(float(fert_gains[i] * 100), 2),
+                "final_yield": round(float(final_yields[i]), 2),
+                "recommended_crop": str(recommended[i]).capitalize(),
+            }
+
+        scenarios = []
+        for i in order:
+            result = {axis: values[idx[a][i]] for a, (axis, values) in enumerate(axes)}
+            result.update(row(i))
+            result["diff_pct"] = round(float(_diff_pct(final_yields[i], base_final)), 2)
+            scenarios.append(result)
+    return {"count": n - 1, "sort_by": sort_by, "base": row(n - 1), "scenarios": scenarios}
@@ -0,0 +1,149 @@
+import json
+import os
+
+import numpy as np
+
+from cropyield.forest import save_array
+
+YIELD_TABLE_VERSION = 1
+# yield_model feature columns (see encode_yield_input)
+STATE, DISTRICT, YEAR, SEASON, CROP, AREA = range(6)
+# the four categorical codes (+1, so unknown = -1 fits) are packed into one int64 key
+RADIX = 1 << 15
+MISS, HIT, INTERPOLATED = 0, 1, 2
+
+
+# ----------------------
+# Model cells along the area axis
+# ----------------------
+def split_points(model, feature):
+    # every threshold the forest compares `feature` against (CompiledForest or sklearn)
+    if hasattr(model, "estimators_"):
+        parts = [est.tree_.threshold[est.tree_.feature == feature] for est in model.estimators_]
+    else:
+        parts = [model.threshold[(model.left != -1) & (model.feature == feature)]]
+    return np.unique(np.concatenate(parts)) if parts else np.zeros(0)
+
+
+def area_cells(grid, thresholds):
+    # The forest goes left when x <= threshold, so its output is constant on (lo, hi]
+    # between consecutive thresholds. An area in the same cell as a grid point gets
+    # exactly that grid point's prediction. Features are compared as float32, like sklearn.
+    grid = np.asarray(grid, dtype=np.float32).astype(np.float64)
+    below = np.searchsorted(thresholds, grid, side="left")
+    lo = np.where(below > 0, thresholds[np.maximum(below - 1, 0)], -np.inf)
+    hi = np.where(below < len(thresholds), thresholds[np.minimum(below, len(thresholds) - 1)], np.inf)
+    return lo, hi
+
+
+def combo_keys(codes):
+    # codes: (n, 4) state, district, season, crop codes as serving encodes them
+    codes = np.asarray(codes, dtype=np.int64) + 1
+    return ((codes[:, 0] * RADIX + codes[:, 1]) * RADIX + codes[:, 2]) * RADIX + codes[:, 3]
+
+
+def slice_features(combos, crop_code, years, grid):
+    # yield_model rows for every (combo, year, area) of one crop slice, in table order
+    n, n_years, n_area = len(combos), len(years), len(grid)
+    X = np.empty((n, n_years, n_area, 6))
+    X[..., STATE] = combos[:, 0, None, None]
+    X[..., DISTRICT] = combos[:, 1, None, None]
+    X[..., YEAR] = np.asarray(years)[None, :, None]
+    X[..., SEASON] = combos[:, 2, None, None]
+    X[..., CROP] = crop_code
+    X[..., AREA] = np.asarray(grid)[None, None, :]
+    return X.reshape(-1, 6)
+
+
+# ----------------------
+# Serving lookups
+# ----------------------
+# One slice per crop code: <dir>/crop_<code>.combos.npy holds the (state, district,
+# season) codes and crop_<code>.values.npy the raw yield_model output for each
+# (combo, year, area grid point), memory-mapped. meta.json has the shared axes.
+class YieldTable:
+    def __init__(self, meta, slices):
+        self.meta = meta
+        self.years = np.arange(meta["years"][0], meta["years"][1] + 1)
+        self.grid = np.asarray(meta["area_grid"], dtype=np.float64)
+        self.lo = np.asarray(meta["area_lo"], dtype=np.float64)
+        self.hi = np.asarray(meta["area_hi"], dtype=np.float64)
+        self.slices = []
+        keys, owners, rows = [], [], []
+        for code, (combos, values) in sorted(slices.items()):
+            codes = np.column_stack([combos, np.full(len(combos), code)])
+            keys.append(combo_keys(codes))
+            owners.append(np.full(len(combos), len(self.slices)))
+            rows.append(np.arange(len(combos)))
+            self.slices.append(values)
+        keys = np.concatenate(keys) if keys else np.zeros(0, dtype=np.int64)
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.owners = np.concatenate(owners)[order] if owners else np.zeros(0, dtype=np.int64)
+        self.rows = np.concatenate(rows)[order] if rows else np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != YIELD_TABLE_VERSION:
+            raise ValueError(f"unsupported yield table version {meta.get('version')} in {path}")
+        slices = {}
+        for code in meta["slices"]:
+            combos = np.load(os.path.join(path, f"crop_{code}.combos.npy"))
+            values = np.load(os.path.join(path, f"crop_{code}.values.npy"), mmap_mode=mmap_mode).view(np.ndarray)
+            slices[int(code)] = (combos, values)
+        return cls(meta, slices)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def lookup(self, yield_X, interpolate=False):
+        # -> (raw yield_model values, status per row); MISS rows are left as nan
+        yield_X = np.asarray(yield_X, dtype=np.float64)
+        n = len(yield_X)
+        values = np.full(n, np.nan)
+        status = np.full(n, MISS, dtype=np.int8)
+        if not n or not len(self.keys):
+            return values, status
+
+        keys = combo_keys(yield_X[:, [STATE, DISTRICT, SEASON, CROP]])
+        pos = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        year = yield_X[:, YEAR] - self.years[0]
+        found = (self.keys[pos] == keys) & (year >= 0) & (year < len(self.years)) & (year == np.floor(year))
+
+        area = yield_X[:, AREA].astype(np.float32).astype(np.float64)
+        cell = np.minimum(np.searchsorted(self.hi, area, side="left"), len(self.hi) - 1)
+        exact = found & (self.lo[cell] < area) & (area <= self.hi[cell])
+        between = found & ~exact & (area >= self.grid[0]) & (area <= self.grid[-1]) if interpolate else None
+
+        owner, row, year = self.owners[pos], self.rows[pos], year.astype(np.int64)
+        for s in np.unique(owner[exact]):
+            take = exact & (owner == s)
+            values[take] = self.slices[s][row[take], year[take], cell[take]]
+        status[exact] = HIT
+        if between is not None and between.any():
+            # linear in log(area) between the two grid points around it
+            right = np.clip(np.searchsorted(self.grid, area, side="left"), 1, len(self.grid) - 1)
+            left = right - 1
+            w = (np.log(area) - np.log(self.grid[left])) / (np.log(self.grid[right]) - np.log(self.grid[left]))
+            for s in np.unique(owner[between]):
+                take = between & (owner == s)
+                table = self.slices[s]
+                values[take] = ((1 - w[take]) * table[row[take], year[take], left[take]]
+                                + w[take] * table[row[take], year[take], right[take]])
+            status[between] = INTERPOLATED
+        return values, status
+
+
+def save_slice(path, crop_code, combos, values):
+    os.makedirs(path, exist_ok=True)
+    save_array(os.path.join(path, f"crop_{crop_code}.combos.npy"), np.ascontiguousarray(combos, dtype=np.int64))
+    save_array(os.path.join(path, f"crop_{crop_code}.values.npy"), np.ascontiguousarray(values, dtype=np.float64))
+
+
+def remove_slice(path, crop_code):
+    for part in ("combos", "values"):
+        file = os.path.join(path, f"crop_{crop_code}.{part}.npy")
+        if os.path.exists(file):
+            os.remove(file)
@@ -1,143 +1,40 @@
+import argparse
 import os
-import joblib
-import json
-from pathlib import Path
+import sys
 
-PROJECT_ROOT = r"C:\Users\balaj\Pictures\hackathon now"
-
-# ----------------------
-# Load models & encoders
-# ----------------------
-yield_model = joblib.load(os.path.join(PROJECT_ROOT, "models", "yield_model.pkl"))
-yield_encoders = joblib.load(os.path.join(PROJECT_ROOT, "encoders", "yield_encoders.pkl"))
-
-crop_model = joblib.load(os.path.join(PROJECT_ROOT, "models", "crop_model.pkl"))
-crop_label_encoder = joblib.load(os.path.join(PROJECT_ROOT, "encoders", "crop_label_encoder.pkl"))
-
-fert_model = joblib.load(os.path.join(PROJECT_ROOT, "models", "fertilizer_model.pkl"))
-fert_encoders = joblib.load(os.path.join(PROJECT_ROOT, "encoders", "fertilizer_encoders.pkl"))
-
-# ----------------------
-# Fertilizer gain table
-# ----------------------
-fert_gain_path = Path(os.path.join(PROJECT_ROOT, "encoders", "fert_gain_table.json"))
-if fert_gain_path.exists():
-    fert_gain_table = json.load(open(fert_gain_path))
-else:
-    fert_gain_table = {}
-
-DEFAULT_FERT_GAIN = 0.10
-YIELD_SCALE_FACTOR = 100.0
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.bulk import bulk_score
+from cropyield.predict import predict_crop
+from cropyield.registry import registry
 
 
 # ----------------------
-# Helpers
+# Bulk mode: score a farm registry file in chunks
 # ----------------------
-def safe_encode(encoder, value):
-    try:
-        return encoder.transform([str(value).lower()])[0]
-    except Exception:
-        return -1
-
-
-def encode_yield_input(state, district, crop_year, season, crop_str, area):
-    s = safe_encode(yield_encoders['state_name'], state)
-    d = safe_encode(yield_encoders['district_name'], district)
-    se = safe_encode(yield_encoders['season'], season)
-    crop_enc = safe_encode(yield_encoders['crop'], crop_str)
-    return [s, d, int(crop_year), se, crop_enc, float(area)]
-
-
-def compute_fert_gain(crop_str, fert_name):
-    crop_str = str(crop_str).lower()
-    fert_name = str(fert_name).lower()
-    if crop_str in fert_gain_table and fert_name in fert_gain_table[crop_str]:
-        return float(fert_gain_table[crop_str][fert_name])
-    return DEFAULT_FERT_GAIN
-
-
-# ----------------------
-# Main prediction function
-# ----------------------
-def predict_crop(farm_meta, soil_weather, selected_crop):
-    # normalize
-    farm_meta = {k: (v.lower() if isinstance(v, str) else v) for k, v in farm_meta.items()}
-    soil_weather = {k: (v.lower() if isinstance(v, str) else v) for k, v in soil_weather.items()}
-    selected_crop = selected_crop.lower()
-
-    # -----------------
-    # 1) Farmer's selected crop
-    # -----------------
-    X_sel = encode_yield_input(
-        farm_meta['state'], farm_meta['district'],
-        farm_meta['crop_year'], farm_meta['season'],
-        selected_crop, farm_meta['area']
-    )
-    sel_yield = yield_model.predict([X_sel])[0] * YIELD_SCALE_FACTOR
-
-    # Fertilizer for selected crop
-    st_enc = safe_encode(fert_encoders['Soil Type'], soil_weather['Soil Type'])
-    ct_enc = safe_encode(fert_encoders['Crop Type'], selected_crop)
-
-    fert_features = [soil_weather['Temperature'], soil_weather['Humidity'],
-                     soil_weather['Soil Moisture'], st_enc, ct_enc,
-                     soil_weather['N'], soil_weather['K'], soil_weather['P']]
-
-    fert_idx = fert_model.predict([fert_features])[0]
-    fert_name_sel = fert_encoders['Fertilizer Name'].inverse_transform([fert_idx])[0]
-
-    fert_gain_sel = compute_fert_gain(selected_crop, fert_name_sel)
-    final_yield_sel = sel_yield * (1 + fert_gain_sel)
-
-    # -----------------
-    # 2) Alternative crop suggestion
-    # -----------------
-    crop_features = [soil_weather['N'], soil_weather['P'], soil_weather['K'],
-                     soil_weather['temperature'], soil_weather['humidity'],
-                     soil_weather['ph'], soil_weather['rainfall']]
-    alt_idx = crop_model.predict([crop_features])[0]
-    alt_crop = crop_label_encoder.inverse_transform([alt_idx])[0].lower()
-
-    X_alt = encode_yield_input(
-        farm_meta['state'], farm_meta['district'],
-        farm_meta['crop_year'], farm_meta['season'],
-        alt_crop, farm_meta['area']
-    )
-    alt_yield = yield_model.predict([X_alt])[0] * YIELD_SCALE_FACTOR
-
-    # Fertilizer for alt crop
-    ct_alt_enc = safe_encode(fert_encoders['Crop Type'], alt_crop)
-    fert_features_alt = [soil_weather['Temperature'], soil_weather['Humidity'],
-                         soil_weather['Soil Moisture'], st_enc, ct_alt_enc,
-                         soil_weather['N'], soil_weather['K'], soil_weather['P']]
-
-    fert_idx_alt = fert_model.predict([fert_features_alt])[0]
-    fert_name_alt = fert_encoders['Fertilizer Name'].inverse_transform([fert_idx_alt])[0]
-
-    fert_gain_alt = compute_fert_gain(alt_crop, fert_name_alt)
-    final_yield_alt = alt_yield * (1 + fert_gain_alt)
-
-    diff_pct_alt = ((final_yield_alt - final_yield_sel) / final_yield_sel) * 100 if final_yield_sel > 0 else 0
-
-    return {
-        "selected_crop": selected_crop.capitalize(),
-        "sel_yield": round(float(sel_yield), 2),
-        "fert_name_sel": fert_name_sel,
-        "fert_gain_sel": round(float(fert_gain_sel * 100), 2),
-        "final_yield_sel": round(float(final_yield_sel), 2),
-        "alt_crop": alt_crop.capitalize(),
-        "alt_yield": round(float(alt_yield), 2),
-        "fert_name_alt": fert_name_alt,
-        "fert_gain_alt": round(float(fert_gain_alt * 100), 2),
-        "final_yield_alt": round(float(final_yield_alt), 2),
-        "diff_pct_alt": round(float(diff_pct_alt), 2)
-    }
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crop yield prediction (interactive, or --bulk for files)")
+    parser.add_argument("--bulk", metavar="INPUT", help="CSV or Parquet file with the web form's field names")
+    parser.add_argument("--output", help="CSV file the scored rows are appended to")
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--workers", type=int, default=1, help="processes scoring chunks in parallel")
+    parser.add_argument("--offset", type=int, default=0, help="skip this many input rows")
+    parser.add_argument("--resume", action="store_true", help="continue after the rows already in --output")
+    return parser.parse_args()
 
 
 # ----------------------
 # Console Input
 # ----------------------
 if __name__ == "__main__":
+    args = parse_args()
+    if args.bulk:
+        if not args.output:
+            sys.exit("--output is required with --bulk")
+        summary = bulk_score(args.bulk, args.output, args.chunk_size, args.workers, args.offset, args.resume)
+        print(f"✅ {summary['rows']} rows scored in {summary['seconds']:.1f}s "
+              f"({summary['rows_per_sec']:,.0f} rows/s) -> {args.output}")
+        sys.exit(0)
+
     print("🌾 Enter Farmer Details")
     state = input("Enter State: ")
     district = input("Enter District: ")
@@ -172,6 +69,7 @@ if __name__ == "__main__":
     }
 
     result = predict_crop(farm, soil_weather, selected_crop)
+    print(f"\n(model load times: {registry.timings()})")
 
     print("\n🌾 Crop Yield Prediction Report\n")
     print(f"👉 Selected Crop: {result['selected_crop']}")
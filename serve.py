@@ -0,0 +1,103 @@
+import argparse
+import os
+import signal
+import socket
+
+from cropyield.registry import registry
+
+
+# ----------------------
+# Production entry point
+# ----------------------
+# Models are loaded once in the parent, then the worker processes are forked so
+# they share the model pages copy-on-write. gunicorn is used when installed;
+# otherwise a small pre-fork loop runs werkzeug servers on one shared socket.
+def run_gunicorn(app, host, port, workers, threads):
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            options = {"bind": f"{host}:{port}", "workers": workers, "threads": threads,
+                       "preload_app": True, "worker_class": "gthread"}
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    Server().run()
+
+
+def run_prefork(app, host, port, workers):
+    from werkzeug.serving import make_server
+
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.set_inheritable(True)
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            make_server(host, port, app, threaded=True, fd=sock.fileno()).serve_forever()
+            os._exit(0)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"🌾 serving on http://{host}:{port} with {workers} worker processes")
+
+    while children:
+        try:
+            pid, _ = os.wait()
+        except ChildProcessError:
+            break
+        children.discard(pid)
+        if not stopping:
+            print(f"⚠️ worker {pid} exited, restarting")
+            spawn()
+    sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the crop yield app with several worker processes")
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", 5000)))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--threads", type=int, default=8, help="request threads per worker (gunicorn)")
+    args = parser.parse_args()
+
+    registry.load_all()
+    print(f"models loaded: {registry.timings()}")
+    from app import app
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        gunicorn = None
+
+    if gunicorn is not None:
+        run_gunicorn(app, args.host, args.port, args.workers, args.threads)
+    elif hasattr(os, "fork"):
+        run_prefork(app, args.host, args.port, args.workers)
+    else:
+        # no fork (Windows): one threaded process
+        from werkzeug.serving import run_simple
+        run_simple(args.host, args.port, app, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
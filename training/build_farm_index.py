@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.neighbors import FEATURES, FarmIndex
+from cropyield.registry import DEFAULT_ARTIFACT_DIR, FARM_INDEX_DIR
+from preprocess_data import SOURCES, clean_chunk, match_columns, read_processed
+
+CROP_CSV = os.path.join("data", "processed_crop_recommendation.csv")
+
+
+# ----------------------
+# Similar-farms index over the crop recommendation data
+# ----------------------
+def build(artifact_dir):
+    df = read_processed(os.path.join(artifact_dir, CROP_CSV)).dropna()
+    start = time.perf_counter()
+    index = FarmIndex.build(df[list(FEATURES)].to_numpy(dtype=np.float64), df["label"].tolist(),
+                            meta={"rows": len(df), "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    path = os.path.join(artifact_dir, FARM_INDEX_DIR)
+    index.save(path)
+    print(f"✅ Farm index over {len(index)} records ({len(index.classes)} crops) built in "
+          f"{time.perf_counter() - start:.2f}s, saved at {path}")
+    return index
+
+
+def append(artifact_dir, csv_path):
+    # labelled records in the processed_crop_recommendation.csv layout, checked like the raw source
+    spec = SOURCES["crop"]
+    raw = pd.read_csv(csv_path, dtype=str, skipinitialspace=True)
+    raw = raw.rename(columns=match_columns(spec, raw.columns, csv_path))
+    stats = Counter()
+    df = clean_chunk(spec, raw[spec["raw"]], stats)
+    if len(df) < len(raw):
+        print(f"⚠️ skipped {len(raw) - len(df)} of {len(raw)} rows: {dict(stats)}")
+
+    path = os.path.join(artifact_dir, FARM_INDEX_DIR)
+    index = FarmIndex.load(path, mmap_mode=None)
+    index.append(df[list(FEATURES)].to_numpy(dtype=np.float64), df["label"].tolist())
+    index.meta.update(rows=len(index), appended=index.meta.get("appended", 0) + len(df))
+    index.save(path)
+    print(f"✅ Appended {len(df)} records, farm index now holds {len(index)}")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the k-nearest similar-farms index")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--append", metavar="CSV", help="add labelled records to the existing index")
+    args = parser.parse_args()
+    if args.append:
+        append(args.artifact_dir, args.append)
+    else:
+        build(args.artifact_dir)
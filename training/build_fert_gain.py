@@ -0,0 +1,44 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.fert_gain import build_gain_table
+from cropyield.registry import DEFAULT_ARTIFACT_DIR, FERT_GAIN_FILE, ModelRegistry
+from preprocess_data import read_processed
+
+FERT_CSV = os.path.join("data", "processed_fertilizer_recommendation.csv")
+YIELD_CSV = os.path.join("data", "processed_production_clean.csv")
+
+
+# ----------------------
+# Crop x fertilizer gain table for compute_fert_gain
+# ----------------------
+def build(artifact_dir):
+    registry = ModelRegistry(artifact_dir)
+    fert_encoders = registry.get("fert_encoders")
+
+    fert_df = read_processed(os.path.join(artifact_dir, FERT_CSV)).dropna()
+    yield_path = os.path.join(artifact_dir, YIELD_CSV)
+    yield_df = None
+    if os.path.exists(yield_path):
+        yield_df = read_processed(yield_path, usecols=["crop", "yield_kg_per_ha"]).dropna()
+    else:
+        print(f"⚠️ {yield_path} not found, using the default headroom for every crop")
+
+    table = build_gain_table(fert_df, yield_df,
+                             fert_encoders["Crop Type"].classes, fert_encoders["Fertilizer Name"].classes)
+    table.meta = {"built_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "fert_rows": len(fert_df),
+                  "yield_rows": 0 if yield_df is None else len(yield_df)}
+    path = os.path.join(artifact_dir, FERT_GAIN_FILE)
+    table.save(path)
+    print(f"✅ Fertilizer gain table ({table.gain.shape[0]} crops x {table.gain.shape[1]} fertilizers) saved at {path}")
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build encoders/fert_gain_table.npz")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    args = parser.parse_args()
+    build(args.artifact_dir)
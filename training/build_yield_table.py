@@ -0,0 +1,141 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.forest import save_json
+from cropyield.registry import DEFAULT_ARTIFACT_DIR, YIELD_TABLE_DIR, ModelRegistry, file_fingerprint
+from cropyield.yield_table import (AREA, RADIX, YIELD_TABLE_VERSION, area_cells, remove_slice, save_slice,
+                                   slice_features, split_points)
+from preprocess_data import read_processed
+
+YIELD_CSV = os.path.join("data", "processed_production_clean.csv")
+AREA_POINTS = 16
+MAX_COMBOS = 2000
+
+
+# ----------------------
+# Table axes
+# ----------------------
+def common_combos(artifact_dir, registry, max_combos):
+    # the (state, district, season, crop) codes seen most often in the training data,
+    # encoded exactly the way predict_crop encodes a request
+    df = read_processed(os.path.join(artifact_dir, YIELD_CSV),
+                        usecols=["state_name", "district_name", "season", "crop", "crop_year", "area"]).dropna()
+    encoders = registry.get("yield_encoders")
+    codes = pd.DataFrame({
+        "state": encoders["state_name"].encode_many(df["state_name"].tolist()),
+        "district": encoders["district_name"].encode_many(df["district_name"].tolist()),
+        "season": encoders["season"].encode_many(df["season"].tolist()),
+        "crop": encoders["crop"].encode_many(df["crop"].tolist()),
+    })
+    if codes.to_numpy().max() + 1 >= RADIX:
+        raise SystemExit(f"❌ more than {RADIX - 2} classes in one encoder, the table keys can't hold them")
+    counts = codes.value_counts().head(max_combos).reset_index()
+    return counts[["state", "district", "season", "crop"]].to_numpy(dtype=np.int64), df
+
+
+def area_grid(areas, points):
+    # geometric spread over the observed areas; float32 like the model sees them
+    areas = areas[areas > 0]
+    grid = np.quantile(areas, np.linspace(0, 1, points))
+    return np.unique(grid.astype(np.float32)).astype(np.float64)
+
+
+# ----------------------
+# Build / incremental refresh
+# ----------------------
+_registries = {}
+
+
+def predict_slice(artifact_dir, crop_code, combos, years, grid):
+    # one registry per worker process, reused across the slices it gets
+    registry = _registries.get(artifact_dir) or _registries.setdefault(artifact_dir, ModelRegistry(artifact_dir))
+    model = registry.get("yield_model")
+    X = slice_features(combos, crop_code, years, grid)
+    return model.predict(X).reshape(len(combos), len(years), len(grid))
+
+
+def build(artifact_dir, years=None, area_points=None, max_combos=None, workers=None, force=False, regrid=False):
+    registry = ModelRegistry(artifact_dir)
+    out_dir = os.path.join(artifact_dir, YIELD_TABLE_DIR)
+    meta_path = os.path.join(out_dir, "meta.json")
+    previous = {}
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            previous = json.load(f)
+        if previous.get("version") != YIELD_TABLE_VERSION:
+            previous = {}
+
+    # keep the previous settings and axes unless asked otherwise, so new data only touches its own slices
+    area_points = area_points or previous.get("area_points") or AREA_POINTS
+    max_combos = max_combos or previous.get("max_combos") or MAX_COMBOS
+    combos, df = common_combos(artifact_dir, registry, max_combos)
+    if years is None:
+        years = previous.get("years") or [int(df["crop_year"].max()) - 9,
+                                          max(int(df["crop_year"].max()), int(time.strftime("%Y")))]
+    if regrid or previous.get("area_points") != area_points:
+        grid = area_grid(df["area"].to_numpy(dtype=np.float64), area_points)
+    else:
+        grid = np.asarray(previous["area_grid"])
+    year_values = np.arange(years[0], years[1] + 1)
+
+    model_fp = file_fingerprint(registry.path("yield_model"))
+    same_axes = (previous.get("model") == model_fp and previous.get("years") == list(years)
+                 and previous.get("area_grid") == grid.tolist())
+    lo, hi = area_cells(grid, split_points(registry.get("yield_model"), AREA))
+
+    slices, todo = {}, {}
+    for code in np.unique(combos[:, 3]):
+        members = combos[combos[:, 3] == code][:, :3]
+        members = members[np.lexsort(members.T[::-1])]
+        slices[str(code)] = {"rows": len(members)}
+        combos_path = os.path.join(out_dir, f"crop_{code}.combos.npy")
+        unchanged = (not force and same_axes and str(code) in previous.get("slices", {})
+                     and os.path.exists(combos_path) and np.array_equal(np.load(combos_path), members))
+        if unchanged:
+            slices[str(code)] = previous["slices"][str(code)]
+        else:
+            todo[int(code)] = members
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {code: pool.submit(predict_slice, artifact_dir, code, members, year_values, grid)
+                   for code, members in todo.items()}
+        for code, future in futures.items():
+            save_slice(out_dir, code, todo[code], future.result())
+            slices[str(code)] = {"rows": len(todo[code]), "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    for code in set(previous.get("slices", {})) - set(slices):
+        remove_slice(out_dir, code)
+
+    meta = {"version": YIELD_TABLE_VERSION, "model": model_fp, "years": [int(y) for y in years],
+            "max_combos": max_combos, "area_points": area_points, "area_grid": grid.tolist(), "area_lo": lo.tolist(), "area_hi": hi.tolist(),
+            "slices": slices, "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    os.makedirs(out_dir, exist_ok=True)
+    save_json(meta_path, meta)
+
+    cells = sum(s["rows"] for s in slices.values()) * len(year_values) * len(grid)
+    print(f"✅ Yield table: {len(slices)} crop slices ({len(todo)} rebuilt in {time.perf_counter() - start:.1f}s), "
+          f"{cells} precomputed predictions saved at {out_dir} (served with CROP_YIELD_TABLE=exact|interpolate)")
+    return meta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute yield_model over common district x season x crop combinations")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--years", help="first:last crop year (default: the last 10 years in the data)")
+    parser.add_argument("--area-points", type=int, help=f"area grid size (default: previous build or {AREA_POINTS})")
+    parser.add_argument("--max-combos", type=int,
+                        help=f"most frequent combinations to precompute (default: previous build or {MAX_COMBOS})")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--force", action="store_true", help="rebuild every slice")
+    parser.add_argument("--regrid", action="store_true", help="recompute the area grid from the data")
+    args = parser.parse_args()
+    years = [int(y) for y in args.years.split(":")] if args.years else None
+    build(args.artifact_dir, years, args.area_points, args.max_combos, args.workers, args.force, args.regrid)
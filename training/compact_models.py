@@ -0,0 +1,193 @@
+import argparse
+import copy
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import joblib
+import numpy as np
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.forest import CompiledForest, export_forest
+from cropyield.registry import DEFAULT_ARTIFACT_DIR, ENCODER_FILES, MODEL_FILES
+from train_all import (MODEL_SPECS, SERVING_PARAMS_FILE, SPLIT, has_yield_table, load_dataset, params_hash,
+                       read_manifest, score, write_manifest)
+
+REPORT_FILE = os.path.join("models", "compaction_report.json")
+GRID = {"n_estimators": [25, 50, 100, 200], "max_depth": [None, 32, 16, 10], "min_samples_leaf": [1, 2, 5]}
+BATCH_ROWS = 1000
+
+
+# ----------------------
+# Size / latency of one candidate forest
+# ----------------------
+def truncate(model, n_trees):
+    # with a fixed random_state the first n trees of a forest are exactly the
+    # forest that n_estimators=n would grow, so one fit covers every tree count
+    small = copy.copy(model)
+    small.estimators_ = model.estimators_[:n_trees]
+    small.n_estimators = n_trees
+    return small
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def measure(model, X_test, engine, repeats=50):
+    tmp = tempfile.mkdtemp(prefix="compact-")
+    try:
+        pickle_path = os.path.join(tmp, "model.pkl")
+        joblib.dump(model, pickle_path)
+        export_forest(model, os.path.join(tmp, "compiled"))
+        sizes = {"pickle_mb": round(os.path.getsize(pickle_path) / 1e6, 3),
+                 "compiled_mb": round(dir_size(os.path.join(tmp, "compiled")) / 1e6, 3)}
+        runner = CompiledForest.load(os.path.join(tmp, "compiled")) if engine == "compiled" else model
+
+        rows = np.asarray(X_test, dtype=np.float64)
+        samples = []
+        for i in range(repeats):
+            row = rows[i % len(rows):i % len(rows) + 1]
+            start = time.perf_counter()
+            runner.predict(row)
+            samples.append(time.perf_counter() - start)
+        batch = np.resize(rows, (BATCH_ROWS, rows.shape[1]))
+        batch_samples = []
+        for _ in range(3):
+            start = time.perf_counter()
+            runner.predict(batch)
+            batch_samples.append(time.perf_counter() - start)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return dict(sizes, single_row_ms=round(float(np.median(samples)) * 1000, 3),
+                batch_rows_per_sec=round(BATCH_ROWS / float(np.median(batch_samples)), 1))
+
+
+# ----------------------
+# Sweep
+# ----------------------
+def sweep(name, artifact_dir, grid, engine, n_jobs=-1):
+    spec = MODEL_SPECS[name]
+    X, y, encoders, data_hash, _ = load_dataset(name, artifact_dir)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, **SPLIT)
+    random_state = spec["params"].get("random_state")
+    max_trees = max(grid["n_estimators"])
+
+    rows, models = [], {}
+    for depth, leaf in itertools.product(grid["max_depth"], grid["min_samples_leaf"]):
+        forest = spec["estimator"](n_estimators=max_trees, max_depth=depth, min_samples_leaf=leaf,
+                                   random_state=random_state, n_jobs=n_jobs)
+        forest.fit(X_train, y_train)
+        forest.n_jobs = None
+        for n_trees in sorted(grid["n_estimators"]):
+            model = truncate(forest, n_trees)
+            params = {"n_estimators": n_trees, "max_depth": depth, "min_samples_leaf": leaf,
+                      "random_state": random_state}
+            row = {"params": params, "metrics": score(spec, y_test, model.predict(X_test))}
+            row.update(measure(model, X_test, engine))
+            rows.append(row)
+            models[len(rows) - 1] = model
+            print(f"   {name} trees={n_trees} depth={depth} leaf={leaf}: {row['metrics']} "
+                  f"{row['pickle_mb']}MB {row['single_row_ms']}ms/row {row['batch_rows_per_sec']} rows/s")
+    return rows, models, encoders, data_hash
+
+
+def pick(rows, baseline, tolerance):
+    # smallest artifact whose accuracy / R² is within `tolerance` of the baseline
+    key = "accuracy" if "accuracy" in baseline["metrics"] else "r2"
+    floor = baseline["metrics"][key] - tolerance
+    within = [i for i, row in enumerate(rows) if row["metrics"][key] >= floor]
+    return min(within, key=lambda i: (rows[i]["pickle_mb"], rows[i]["single_row_ms"]))
+
+
+def compact(name, artifact_dir, grid, tolerance, engine, apply=False, n_jobs=-1):
+    spec = MODEL_SPECS[name]
+    baseline_params = {"n_estimators": spec["params"]["n_estimators"], "max_depth": None, "min_samples_leaf": 1,
+                       "random_state": spec["params"].get("random_state")}
+    grid = {k: sorted(set(v) | {baseline_params[k]}, key=lambda x: (x is not None, x or 0)) for k, v in grid.items()}
+
+    rows, models, encoders, data_hash = sweep(name, artifact_dir, grid, engine, n_jobs)
+    baseline = next(i for i, row in enumerate(rows) if row["params"] == baseline_params)
+    chosen = pick(rows, rows[baseline], tolerance)
+    print(f"✅ {name}: {rows[chosen]['params']} {rows[chosen]['metrics']} "
+          f"{rows[chosen]['pickle_mb']}MB vs baseline {rows[baseline]['metrics']} {rows[baseline]['pickle_mb']}MB")
+
+    if apply:
+        save(name, artifact_dir, models[chosen], encoders, data_hash, rows[chosen])
+    return {"engine": engine, "tolerance": tolerance, "baseline": baseline, "chosen": chosen, "configs": rows}
+
+
+def save(name, artifact_dir, model, encoders, data_hash, row):
+    # serving model + its params, so train_all.py keeps growing the compact forest
+    spec = MODEL_SPECS[name]
+    joblib.dump(model, os.path.join(artifact_dir, MODEL_FILES[spec["model"]]))
+    joblib.dump(encoders, os.path.join(artifact_dir, ENCODER_FILES[spec["encoders"]]))
+
+    path = os.path.join(artifact_dir, SERVING_PARAMS_FILE)
+    overrides = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            overrides = json.load(f)
+    overrides[name] = {k: v for k, v in row["params"].items() if k != "random_state"}
+    with open(path, "w") as f:
+        json.dump(overrides, f, indent=2)
+
+    params = dict(spec["params"], **overrides[name])
+    manifest = read_manifest(artifact_dir)
+    manifest[name] = dict(manifest.get(name, {}), data_hash=data_hash, params_hash=params_hash(name, params),
+                          params=params, metrics=row["metrics"], trained_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                          compacted=True)
+    write_manifest(artifact_dir, manifest)
+
+
+def parse_list(text, cast):
+    return [None if item.lower() == "none" else cast(item) for item in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep forest size and keep the smallest model within tolerance")
+    parser.add_argument("models", nargs="*", help=f"subset of {', '.join(MODEL_SPECS)} (default: all)")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--trees", default=",".join(str(v) for v in GRID["n_estimators"]))
+    parser.add_argument("--depths", default=",".join(str(v) for v in GRID["max_depth"]))
+    parser.add_argument("--leaves", default=",".join(str(v) for v in GRID["min_samples_leaf"]))
+    parser.add_argument("--tolerance", type=float, default=0.01, help="allowed drop in accuracy / R²")
+    parser.add_argument("--engine", choices=["compiled", "sklearn"], default="compiled",
+                        help="inference engine the latencies are measured with")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="cores per forest")
+    parser.add_argument("--apply", action="store_true", help="replace the serving models with the chosen ones")
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODEL_SPECS)
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(sorted(unknown))}")
+
+    grid = {"n_estimators": parse_list(args.trees, int), "max_depth": parse_list(args.depths, int),
+            "min_samples_leaf": parse_list(args.leaves, int)}
+    report = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "models": {}}
+    for name in args.models or list(MODEL_SPECS):
+        report["models"][name] = compact(name, args.artifact_dir, grid, args.tolerance, args.engine,
+                                         args.apply, args.n_jobs)
+
+    path = os.path.join(args.artifact_dir, REPORT_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Compaction report saved at {path}")
+
+    if args.apply:
+        from export_models import export_all
+        export_all(args.artifact_dir)
+        if "yield" in report["models"] and has_yield_table(args.artifact_dir):
+            from build_yield_table import build as build_yield_table
+            build_yield_table(args.artifact_dir)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.forest import CompiledForest, export_forest
+from cropyield.registry import (COMPILED_ENCODERS_FILE, DEFAULT_ARTIFACT_DIR, ENCODER_FILES, MODEL_FILES,
+                                ModelRegistry, file_fingerprint)
+
+
+# ----------------------
+# Export trained forests + encoders for the numpy inference engine
+# ----------------------
+def export_all(artifact_dir, verify_rows=256):
+    registry = ModelRegistry(artifact_dir, use_compiled=False)
+
+    for name in MODEL_FILES:
+        source = registry.path(name)
+        if not os.path.exists(source):
+            print(f"⚠️ {source} not found, skipping {name}")
+            continue
+        model = joblib.load(source)
+        start = time.perf_counter()
+        meta = export_forest(model, registry.compiled_path(name), source=file_fingerprint(source))
+        print(f"✅ {name}: {meta['n_trees']} trees, depth {meta['max_depth']} "
+              f"-> {registry.compiled_path(name)} ({time.perf_counter() - start:.2f}s)")
+
+        if verify_rows:
+            verify(model, CompiledForest.load(registry.compiled_path(name)), verify_rows)
+
+    classes, sources = {}, {}
+    for name in ENCODER_FILES:
+        source = registry.path(name)
+        if not os.path.exists(source):
+            continue
+        encoders = joblib.load(source)
+        if isinstance(encoders, dict):
+            classes[name] = {col: enc.classes_.tolist() for col, enc in encoders.items()}
+        else:
+            classes[name] = encoders.classes_.tolist()
+        sources[name] = file_fingerprint(source)
+
+    path = os.path.join(artifact_dir, COMPILED_ENCODERS_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({"sources": sources, "classes": classes}, f)
+    print(f"✅ Encoder classes saved at {path}")
+
+
+def verify(model, compiled, n_rows):
+    # random rows inside the training range must give identical outputs
+    rng = np.random.default_rng(0)
+    thresholds = [est.tree_.threshold[est.tree_.feature >= 0] for est in model.estimators_[:5]]
+    features = [est.tree_.feature[est.tree_.feature >= 0] for est in model.estimators_[:5]]
+    thresholds, features = np.concatenate(thresholds), np.concatenate(features)
+    X = np.zeros((n_rows, model.n_features_in_))
+    for j in range(model.n_features_in_):
+        col = thresholds[features == j]
+        lo, hi = (col.min() - 1, col.max() + 1) if len(col) else (0, 1)
+        X[:, j] = rng.uniform(lo, hi, n_rows)
+
+    if hasattr(model, "classes_"):
+        same = np.array_equal(model.predict_proba(X), compiled.predict_proba(X))
+    else:
+        same = np.array_equal(model.predict(X), compiled.predict(X))
+    if not same:
+        raise SystemExit("❌ compiled forest does not match the sklearn model")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Flatten trained forests into packed numpy arrays")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--verify-rows", type=int, default=256)
+    args = parser.parse_args()
+    export_all(args.artifact_dir, args.verify_rows)
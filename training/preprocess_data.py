@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.records import RANGES
+from cropyield.registry import DEFAULT_ARTIFACT_DIR
+
+# raw production is in tonnes, area in hectares. yield_kg_per_ha keeps the column name
+# the models were first trained with but holds quintals/ha (1 t = 10 q); serving turns
+# the model output into kg/ha with predict.YIELD_SCALE_FACTOR (1 q = 100 kg)
+PRODUCTION_TO_QUINTALS = 10
+MEMORY_MB = 512
+# a chunk is held a few times over while it is cleaned (raw strings, numbers, output)
+WORKING_COPIES = 4
+SCHEMA_SUFFIX = ".schema.json"
+
+
+# ----------------------
+# Sources and the processed files they produce
+# ----------------------
+# raw: the columns read from the source, matched case- and whitespace-insensitively.
+# columns: the processed file, in order, with the dtype it is written and read back with.
+# lower: text matched by the encoders (LookupEncoder lowercases every lookup); strip: labels only.
+def _production_yield(df):
+    df = df[df["area"] > 0]
+    return df.assign(yield_kg_per_ha=df["production"] * PRODUCTION_TO_QUINTALS / df["area"])
+
+
+SOURCES = {
+    "production": {
+        "output": os.path.join("data", "processed_production_clean.csv"),
+        "raw": ["state_name", "district_name", "season", "crop", "crop_year", "area", "production"],
+        "columns": {"state_name": "category", "district_name": "category", "season": "category",
+                    "crop": "category", "crop_year": "int32", "area": "float64", "yield_kg_per_ha": "float64"},
+        "lower": ["state_name", "district_name", "season", "crop"],
+        "strip": [],
+        "ranges": {"crop_year": (1900, 2100), "area": (0, np.inf), "production": (0, np.inf)},
+        "derive": _production_yield,
+    },
+    "crop": {
+        "output": os.path.join("data", "processed_crop_recommendation.csv"),
+        "raw": ["N", "P", "K", "temperature", "humidity", "ph", "rainfall", "label"],
+        "columns": {"N": "int32", "P": "int32", "K": "int32", "temperature": "float64", "humidity": "float64",
+                    "ph": "float64", "rainfall": "float64", "label": "category"},
+        "lower": ["label"],
+        "strip": [],
+        "ranges": dict(RANGES, rainfall=(0, np.inf)),
+        "derive": None,
+    },
+    "fertilizer": {
+        "output": os.path.join("data", "processed_fertilizer_recommendation.csv"),
+        "raw": ["Temparature", "Humidity", "Soil Moisture", "Soil Type", "Crop Type", "Nitrogen", "Potassium",
+                "Phosphorous", "Fertilizer Name"],
+        "columns": {"Temparature": "float64", "Humidity": "float64", "Soil Moisture": "float64",
+                    "Soil Type": "category", "Crop Type": "category", "Nitrogen": "int32", "Potassium": "int32",
+                    "Phosphorous": "int32", "Fertilizer Name": "category"},
+        "lower": ["Soil Type", "Crop Type"],
+        "strip": ["Fertilizer Name"],
+        "ranges": {"Humidity": RANGES["humidity"], "Soil Moisture": (0, 100), "Nitrogen": RANGES["N"],
+                   "Potassium": RANGES["K"], "Phosphorous": RANGES["P"]},
+        "derive": None,
+    },
+}
+
+
+def _key(name):
+    return " ".join(str(name).split()).lower()
+
+
+def match_columns(spec, header, source):
+    # {header name: spec name} for the raw columns a source needs
+    wanted = {_key(column): column for column in spec["raw"]}
+    found = {column: wanted[_key(column)] for column in header if _key(column) in wanted}
+    absent = set(spec["raw"]) - set(found.values())
+    if absent:
+        raise ValueError(f"{source} has no {', '.join(sorted(absent))} column")
+    return found
+
+
+def read_processed(path, usecols=None):
+    # a processed CSV with the dtypes from its schema sidecar; plain inference for hand-made files
+    schema_path = path + SCHEMA_SUFFIX
+    if not os.path.exists(schema_path):
+        return pd.read_csv(path, usecols=usecols)
+    with open(schema_path) as f:
+        dtypes = json.load(f)["columns"]
+    if usecols is not None:
+        dtypes = {name: dtypes[name] for name in usecols if name in dtypes}
+    return pd.read_csv(path, usecols=usecols, dtype=dtypes)
+
+
+# ----------------------
+# Chunk cleaning (vectorised, one pass per column)
+# ----------------------
+def clean_chunk(spec, raw, stats):
+    text = spec["lower"] + spec["strip"]
+    df = pd.DataFrame(index=raw.index)
+    bad = pd.Series(False, index=raw.index)
+    missing = raw.isna().any(axis=1)
+    for name in spec["raw"]:
+        column = raw[name]
+        if name in text:
+            column = column.str.replace(r"\s+", " ", regex=True).str.strip()
+            if name in spec["lower"]:
+                column = column.str.lower()
+            missing |= column.eq("")
+        else:
+            column = pd.to_numeric(column, errors="coerce")
+            bad |= column.isna() & raw[name].notna()
+            if spec["columns"].get(name, "").startswith("int"):
+                bad |= column.notna() & (column != np.floor(column))
+        df[name] = column
+    bad &= ~missing
+
+    out_of_range = pd.Series(False, index=raw.index)
+    for name, (lo, hi) in spec["ranges"].items():
+        out_of_range |= ~df[name].between(lo, hi)
+    out_of_range &= ~(missing | bad)
+
+    stats["missing"] += int(missing.sum())
+    stats["bad_number"] += int(bad.sum())
+    stats["out_of_range"] += int(out_of_range.sum())
+    df = df[~(missing | bad | out_of_range)]
+    if spec["derive"] is not None:
+        n = len(df)
+        df = spec["derive"](df)
+        stats["out_of_range"] += n - len(df)
+    df = df[list(spec["columns"])]
+    finite = np.isfinite(df.select_dtypes("number")).all(axis=1)
+    stats["out_of_range"] += int((~finite).sum())
+    return df[finite].astype({name: dtype for name, dtype in spec["columns"].items() if dtype != "category"})
+
+
+class SeenRows:
+    # 64-bit hashes of every row written so far, kept sorted; 8 bytes per distinct row
+    def __init__(self, max_rows):
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.max_rows = max_rows
+
+    def new(self, df):
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        pos = np.minimum(np.searchsorted(self.hashes, hashes), max(len(self.hashes) - 1, 0))
+        seen = (self.hashes[pos] == hashes) if len(self.hashes) else np.zeros(len(hashes), dtype=bool)
+        keep = first & ~seen
+        if len(self.hashes) + keep.sum() > self.max_rows:
+            raise MemoryError(f"more than {self.max_rows} distinct rows; raise --memory-mb to deduplicate them")
+        self.hashes = np.union1d(self.hashes, hashes[keep])
+        return keep
+
+
+# ----------------------
+# Streaming one source -> one processed file
+# ----------------------
+def chunk_rows(path, usecols, budget):
+    # rows per chunk from the in-memory size of a sample, as read (strings)
+    sample = pd.read_csv(path, nrows=2000, dtype=str, usecols=usecols, skipinitialspace=True)
+    per_row = max(sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1), 1)
+    return max(1000, int(budget / (per_row * WORKING_COPIES)))
+
+
+def preprocess(name, raw_path, artifact_dir, memory_mb=MEMORY_MB):
+    spec = SOURCES[name]
+    found = match_columns(spec, pd.read_csv(raw_path, nrows=0, skipinitialspace=True).columns, raw_path)
+
+    # half the budget for the chunk being cleaned, half for the duplicate hashes
+    budget = memory_mb * (1 << 20) / 2
+    rows = chunk_rows(raw_path, list(found), budget)
+    seen = SeenRows(int(budget // 8))
+    output = os.path.join(artifact_dir, spec["output"])
+    tmp = f"{output}.tmp-{os.getpid()}"
+    stats = {"read": 0, "missing": 0, "bad_number": 0, "out_of_range": 0, "duplicates": 0, "written": 0}
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    try:
+        reader = pd.read_csv(raw_path, usecols=list(found), dtype=str, chunksize=rows, skipinitialspace=True)
+        for i, raw in enumerate(reader):
+            stats["read"] += len(raw)
+            df = clean_chunk(spec, raw.rename(columns=found), stats)
+            keep = seen.new(df)
+            stats["duplicates"] += int((~keep).sum())
+            df = df[keep]
+            stats["written"] += len(df)
+            df.to_csv(tmp, mode="w" if i == 0 else "a", header=i == 0, index=False)
+        if stats["read"] == 0:
+            pd.DataFrame(columns=list(spec["columns"])).to_csv(tmp, index=False)
+        os.replace(tmp, output)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+    schema = {"columns": spec["columns"], "source": os.path.abspath(raw_path), "rows": stats["written"],
+              "stats": stats, "chunk_rows": rows, "built_at": time.strftime("%Y-%m-%dT%H:%M:%S")}
+    with open(output + SCHEMA_SUFFIX, "w") as f:
+        json.dump(schema, f, indent=2)
+    dropped = stats["read"] - stats["written"]
+    print(f"✅ {name}: {stats['written']} of {stats['read']} rows written to {output} in "
+          f"{time.perf_counter() - start:.1f}s ({dropped} dropped: {stats['missing']} missing, "
+          f"{stats['bad_number']} not numeric, {stats['out_of_range']} out of range, {stats['duplicates']} duplicates)")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the processed_*.csv training inputs from the raw sources")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--production", help="raw crop production table (State_Name, ..., Area, Production)")
+    parser.add_argument("--crop", help="raw crop recommendation table (N, P, K, ..., label)")
+    parser.add_argument("--fertilizer", help="raw fertilizer recommendation table")
+    parser.add_argument("--memory-mb", type=int, default=MEMORY_MB, help="memory budget per source")
+    args = parser.parse_args()
+    sources = {name: getattr(args, name) for name in SOURCES if getattr(args, name)}
+    if not sources:
+        parser.error("give at least one of --production, --crop, --fertilizer")
+    for name, path in sources.items():
+        preprocess(name, path, args.artifact_dir, args.memory_mb)
@@ -0,0 +1,91 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield import releases
+from cropyield.registry import DEFAULT_ARTIFACT_DIR, RELEASE_ITEMS
+
+# written by training/train_all.py
+TRAINING_MANIFEST = os.path.join("models", "train_manifest.json")
+
+
+# ----------------------
+# Publish / switch artifact releases
+# ----------------------
+# Running workers poll releases/CURRENT (CROP_RELOAD_INTERVAL) and swap to the new
+# version on their own; nothing needs a restart.
+def publish(artifact_dir, version=None, activate=True):
+    info = {}
+    training = os.path.join(artifact_dir, TRAINING_MANIFEST)
+    if os.path.exists(training):
+        with open(training) as f:
+            info["training"] = json.load(f)
+    manifest, created = releases.publish(artifact_dir, RELEASE_ITEMS, version, activate, info)
+    if created:
+        print(f"✅ Published release {manifest['version']} ({len(manifest['files'])} files)")
+    else:
+        print(f"⏭️ Artifacts unchanged, already published as {manifest['version']}")
+    if activate:
+        print(f"✅ Serving {manifest['version']}")
+    return manifest
+
+
+def show(artifact_dir):
+    current = releases.current_version(artifact_dir)
+    found = releases.list_releases(artifact_dir)
+    if not found:
+        print("no releases yet; serving the working artifacts")
+    for version in found:
+        manifest = releases.read_manifest(releases.release_dir(artifact_dir, version))
+        marker = "*" if version == current else " "
+        print(f"{marker} {version}  {manifest['created']}  {len(manifest['files'])} files")
+
+
+def verify_all(artifact_dir, versions=None):
+    ok = True
+    for version in versions or releases.list_releases(artifact_dir):
+        problems = releases.verify(releases.release_dir(artifact_dir, version))
+        if problems:
+            ok = False
+            print(f"❌ {version}: {'; '.join(problems)}")
+        else:
+            print(f"✅ {version}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Versioned artifact releases for hot model reloads")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("publish", help="freeze the current models/ and encoders/ as a release")
+    p.add_argument("--version", help="release name (default: timestamp + content hash)")
+    p.add_argument("--no-activate", action="store_true", help="publish without serving it")
+    commands.add_parser("list", help="show releases, * marks the one being served")
+    p = commands.add_parser("activate", help="serve an existing release")
+    p.add_argument("version")
+    p = commands.add_parser("rollback", help="go back to the previously served release")
+    p.add_argument("--to", help="a specific release instead of the previous one")
+    p = commands.add_parser("verify", help="check release files against their manifest hashes")
+    p.add_argument("versions", nargs="*")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "publish":
+            publish(args.artifact_dir, args.version, not args.no_activate)
+        elif args.command == "list":
+            show(args.artifact_dir)
+        elif args.command == "activate":
+            releases.activate(args.artifact_dir, args.version)
+            print(f"✅ Serving {args.version}")
+        elif args.command == "rollback":
+            print(f"✅ Rolled back to {releases.rollback(args.artifact_dir, args.to)}")
+        elif not verify_all(args.artifact_dir, args.versions):
+            sys.exit(1)
+    except (KeyError, OSError) as e:
+        sys.exit(f"❌ {e.args[0] if isinstance(e, KeyError) else e}")
+
+
+if __name__ == "__main__":
+    main()
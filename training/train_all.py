@@ -0,0 +1,287 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.metrics import accuracy_score, mean_absolute_error, r2_score
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.registry import DEFAULT_ARTIFACT_DIR, ENCODER_FILES, FARM_INDEX_DIR, MODEL_FILES, YIELD_TABLE_DIR
+from preprocess_data import read_processed
+
+DATASET_CACHE_DIR = os.path.join("models", "cache", "datasets")
+MANIFEST_FILE = os.path.join("models", "train_manifest.json")
+# per-model hyperparameter overrides, written by training/compact_models.py --apply
+SERVING_PARAMS_FILE = os.path.join("models", "serving_params.json")
+
+
+# ----------------------
+# Dataset preparation (same encoding as the original train_*.py scripts)
+# ----------------------
+def prepare_crop(df):
+    df = df.dropna()
+    le_label = LabelEncoder()
+    y = le_label.fit_transform(df['label'].astype(str))
+    X = df[['N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall']]
+    return X, y, le_label
+
+
+def prepare_fertilizer(df):
+    df = df.dropna()
+    encoders = {}
+    for col in ['Soil Type', 'Crop Type', 'Fertilizer Name']:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col].astype(str))
+        encoders[col] = le
+    X = df[['Temparature', 'Humidity', 'Soil Moisture',
+            'Soil Type', 'Crop Type', 'Nitrogen',
+            'Potassium', 'Phosphorous']]
+    return X, df['Fertilizer Name'], encoders
+
+
+def prepare_yield(df):
+    df = df.dropna()
+    encoders = {}
+    for col in ['state_name', 'district_name', 'season', 'crop']:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col].astype(str))
+        encoders[col] = le
+    X = df[['state_name', 'district_name', 'crop_year', 'season', 'crop', 'area']]
+    return X, df['yield_kg_per_ha'], encoders
+
+
+MODEL_SPECS = {
+    "crop": {
+        "csv": os.path.join("data", "processed_crop_recommendation.csv"),
+        "prepare": prepare_crop,
+        "estimator": RandomForestClassifier,
+        "params": {"n_estimators": 200, "random_state": 42},
+        "model": "crop_model",
+        "encoders": "crop_label_encoder",
+    },
+    "fertilizer": {
+        "csv": os.path.join("data", "processed_fertilizer_recommendation.csv"),
+        "prepare": prepare_fertilizer,
+        "estimator": RandomForestClassifier,
+        "params": {"n_estimators": 200, "random_state": 42},
+        "model": "fert_model",
+        "encoders": "fert_encoders",
+    },
+    "yield": {
+        "csv": os.path.join("data", "processed_production_clean.csv"),
+        "prepare": prepare_yield,
+        "estimator": RandomForestRegressor,
+        "params": {"n_estimators": 200, "random_state": 42},
+        "model": "yield_model",
+        "encoders": "yield_encoders",
+    },
+}
+SPLIT = {"test_size": 0.2, "random_state": 42}
+
+
+# ----------------------
+# Cached datasets keyed on the CSV content hash
+# ----------------------
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_dataset(name, artifact_dir, data_hash=None):
+    spec = MODEL_SPECS[name]
+    csv_path = os.path.join(artifact_dir, spec["csv"])
+    data_hash = data_hash or file_sha256(csv_path)
+    cache_dir = os.path.join(artifact_dir, DATASET_CACHE_DIR, f"{name}-{data_hash[:16]}")
+    meta_path = os.path.join(cache_dir, "meta.json")
+
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            columns = json.load(f)["columns"]
+        X = pd.DataFrame(np.load(os.path.join(cache_dir, "X.npy")), columns=columns)
+        y = np.load(os.path.join(cache_dir, "y.npy"))
+        encoders = joblib.load(os.path.join(cache_dir, "encoders.pkl"))
+        return X, y, encoders, data_hash, True
+
+    X, y, encoders = spec["prepare"](read_processed(csv_path))
+    y = np.asarray(y)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(os.path.join(cache_dir, "X.npy"), X.to_numpy(dtype=np.float64))
+    np.save(os.path.join(cache_dir, "y.npy"), y)
+    joblib.dump(encoders, os.path.join(cache_dir, "encoders.pkl"))
+    with open(meta_path, "w") as f:
+        json.dump({"columns": list(X.columns), "csv": spec["csv"], "sha256": data_hash}, f)
+    return X, y, encoders, data_hash, False
+
+
+def model_params(name, artifact_dir):
+    params = dict(MODEL_SPECS[name]["params"])
+    path = os.path.join(artifact_dir, SERVING_PARAMS_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            params.update(json.load(f).get(name, {}))
+    return params
+
+
+def params_hash(name, params=None):
+    spec = MODEL_SPECS[name]
+    payload = {"estimator": spec["estimator"].__name__, "params": params or spec["params"], "split": SPLIT,
+               "features": spec["prepare"].__name__}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def read_manifest(artifact_dir):
+    path = os.path.join(artifact_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def score(spec, y_test, y_pred):
+    if spec["estimator"] is RandomForestClassifier:
+        return {"accuracy": float(accuracy_score(y_test, y_pred))}
+    return {"r2": float(r2_score(y_test, y_pred)), "mae": float(mean_absolute_error(y_test, y_pred))}
+
+
+def write_manifest(artifact_dir, manifest):
+    path = os.path.join(artifact_dir, MANIFEST_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+# ----------------------
+# Training (one process per model, all cores inside each forest)
+# ----------------------
+def train_model(name, artifact_dir, n_jobs=-1, force=False):
+    spec = MODEL_SPECS[name]
+    model_path = os.path.join(artifact_dir, MODEL_FILES[spec["model"]])
+    encoder_path = os.path.join(artifact_dir, ENCODER_FILES[spec["encoders"]])
+    data_hash = file_sha256(os.path.join(artifact_dir, spec["csv"]))
+    params = model_params(name, artifact_dir)
+
+    previous = read_manifest(artifact_dir).get(name, {})
+    if (not force and os.path.exists(model_path) and os.path.exists(encoder_path)
+            and previous.get("data_hash") == data_hash and previous.get("params_hash") == params_hash(name, params)):
+        return {"name": name, "skipped": True}
+
+    start = time.perf_counter()
+    X, y, encoders, data_hash, cached = load_dataset(name, artifact_dir, data_hash)
+    load_seconds = time.perf_counter() - start
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, **SPLIT)
+
+    model = spec["estimator"](**params, n_jobs=n_jobs)
+    fit_start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - fit_start
+    y_pred = model.predict(X_test)
+
+    metrics = score(spec, y_test, y_pred)
+
+    # serving predicts one farm at a time; thread fan-out there only adds overhead
+    model.n_jobs = None
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    os.makedirs(os.path.dirname(encoder_path), exist_ok=True)
+    joblib.dump(model, model_path)
+    joblib.dump(encoders, encoder_path)
+
+    return {
+        "name": name, "skipped": False, "dataset_cached": cached,
+        "data_hash": data_hash, "params_hash": params_hash(name, params), "params": params,
+        "metrics": metrics, "load_seconds": load_seconds, "fit_seconds": fit_seconds,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def train_all(names, artifact_dir, workers=None, n_jobs=-1, force=False):
+    # -> (results of the models that trained or were skipped, {name: error} for the rest);
+    # the manifest is updated for every model that trained, whatever happened to the others
+    manifest = read_manifest(artifact_dir)
+    results, failures = {}, {}
+    with ProcessPoolExecutor(max_workers=workers or len(names)) as pool:
+        futures = {name: pool.submit(train_model, name, artifact_dir, n_jobs, force) for name in names}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                failures[name] = f"{type(e).__name__}: {e}"
+                print(f"❌ {name}: training failed: {failures[name]}")
+
+    for name, result in results.items():
+        if result["skipped"]:
+            print(f"⏭️ {name}: data and hyperparameters unchanged, skipped")
+            continue
+        manifest[name] = {k: v for k, v in result.items() if k not in ("name", "skipped", "dataset_cached")}
+        print(f"✅ {name}: {result['metrics']} (fit {result['fit_seconds']:.1f}s, "
+              f"dataset {'cached' if result['dataset_cached'] else 'parsed'} in {result['load_seconds']:.2f}s)")
+
+    write_manifest(artifact_dir, manifest)
+    return results, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the crop, fertilizer and yield models")
+    parser.add_argument("models", nargs="*", help=f"subset of {', '.join(MODEL_SPECS)} (default: all)")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--workers", type=int, default=None, help="models trained at once")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="cores per forest")
+    parser.add_argument("--force", action="store_true", help="retrain even if nothing changed")
+    parser.add_argument("--no-export", action="store_true", help="skip training/export_models.py")
+    parser.add_argument("--release", action="store_true",
+                        help="publish and serve the result as a new release (training/release.py)")
+    args = parser.parse_args(argv)
+    unknown = set(args.models) - set(MODEL_SPECS)
+    if unknown:
+        parser.error(f"unknown model(s): {', '.join(sorted(unknown))}")
+
+    results, failures = train_all(args.models or list(MODEL_SPECS), args.artifact_dir, args.workers, args.n_jobs,
+                                  args.force)
+    if any(not results[name]["skipped"] for name in ("fertilizer", "yield") if name in results):
+        from build_fert_gain import build
+        build(args.artifact_dir)
+    if not args.no_export and not all(r["skipped"] for r in results.values()):
+        from export_models import export_all
+        export_all(args.artifact_dir)
+    if not results.get("yield", {"skipped": True})["skipped"] and has_yield_table(args.artifact_dir):
+        from build_yield_table import build as build_yield_table
+        build_yield_table(args.artifact_dir)
+    if not results.get("crop", {"skipped": True})["skipped"] and has_farm_index(args.artifact_dir):
+        from build_farm_index import build as build_farm_index
+        build_farm_index(args.artifact_dir)
+    if failures:
+        # the models that trained are saved and in the manifest; never release a partial retrain
+        if args.release:
+            print("⏭️ not publishing a release: some models failed to train")
+        sys.exit(1)
+    if args.release:
+        from release import publish
+        publish(args.artifact_dir)
+    return results
+
+
+def has_yield_table(artifact_dir):
+    # the table is opt-in (training/build_yield_table.py); once built it follows the yield model
+    return os.path.exists(os.path.join(artifact_dir, YIELD_TABLE_DIR, "meta.json"))
+
+
+def has_farm_index(artifact_dir):
+    # opt-in as well (training/build_farm_index.py); rebuilt when the crop data changes
+    return os.path.exists(os.path.join(artifact_dir, FARM_INDEX_DIR, "meta.json"))
+
+
+if __name__ == "__main__":
+    main()
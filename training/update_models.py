@@ -0,0 +1,199 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import train_test_split
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cropyield.feedback import FEEDBACK_FILE, FeedbackLog, decode_text, parse_feedback
+from cropyield.predict import YIELD_SCALE_FACTOR
+from cropyield.registry import DEFAULT_ARTIFACT_DIR, MODEL_FILES, ModelRegistry
+from train_all import (MODEL_SPECS, SPLIT, has_yield_table, load_dataset, read_manifest, score,
+                       write_manifest)
+
+REPORT_FILE = os.path.join("models", "update_report.json")
+UPDATE_TREES = 20
+# share of the feedback kept out of the new trees to validate them on (fixed per row)
+FEEDBACK_HOLDOUT = 0.2
+# largest R² drop on either held-out set that still gets published
+TOLERANCE = 0.0
+
+
+# ----------------------
+# Feedback -> yield_model rows
+# ----------------------
+# Only the yield model learns from field feedback: observations carry the crop that was
+# grown and its yield, not a recommended crop or fertilizer label.
+def encode_feedback(rows, encoders, columns):
+    # encoders: the registry's LookupEncoders, so observations get exactly the codes serving
+    # gives the same inputs; rows with a state, district, season or crop they don't know
+    # (-1 at serving) need a full retrain
+    codes, known = {}, np.ones(len(rows), dtype=bool)
+    for column, field in (("state_name", "state"), ("district_name", "district"), ("season", "season"),
+                          ("crop", "crop")):
+        codes[column] = encoders[column].encode_many(decode_text(rows[field]))
+        known &= codes[column] >= 0
+    X = pd.DataFrame({"state_name": codes["state_name"], "district_name": codes["district_name"],
+                      "crop_year": rows["crop_year"], "season": codes["season"], "crop": codes["crop"],
+                      "area": rows["area"]}, columns=columns).astype(float)
+    # the model is trained on quintals/ha (yield_kg_per_ha); the app reports kg/ha, x YIELD_SCALE_FACTOR
+    y = np.asarray(rows["observed_yield"], dtype=np.float64) / YIELD_SCALE_FACTOR
+    return X, y, known
+
+
+def holdout_mask(n, fraction=FEEDBACK_HOLDOUT):
+    # the same rows stay held out as the log grows (the generator's prefix is stable)
+    return np.random.default_rng(42).random(n) < fraction
+
+
+def trees_grown(entry, model):
+    # every tree fitted since the last full training, including those replace dropped
+    if "trees_grown" in entry:
+        return entry["trees_grown"]
+    dropped = sum(u["trees_added"] for u in entry.get("updates", []) if u["mode"] == "replace")
+    return len(model.estimators_) + dropped
+
+
+def fresh_seed(model, grown):
+    # warm_start draws the new trees' seeds from random_state after skipping one per
+    # existing tree; with the original seed, trees added after replace dropped the oldest
+    # would repeat the seeds of the trees that are left. A stream of its own per update:
+    base = model.random_state if isinstance(model.random_state, int) else 0
+    return int(np.random.SeedSequence([base, grown]).generate_state(1)[0])
+
+
+def _save_model(model, path):
+    tmp = f"{path}.tmp-{os.getpid()}"
+    joblib.dump(model, tmp)
+    os.replace(tmp, path)
+
+
+# ----------------------
+# Incremental update: warm_start trees on the new data, then re-validate
+# ----------------------
+def update(artifact_dir, trees=UPDATE_TREES, mode="grow", tolerance=TOLERANCE, n_jobs=-1, force=False):
+    spec = MODEL_SPECS["yield"]
+    model_path = os.path.join(artifact_dir, MODEL_FILES[spec["model"]])
+    manifest = read_manifest(artifact_dir)
+    entry = manifest.get("yield", {})
+
+    rows = np.array(FeedbackLog(os.path.join(artifact_dir, FEEDBACK_FILE)).read())
+    consumed = entry.get("feedback_rows", 0)
+    if len(rows) <= consumed and not force:
+        print(f"⏭️ no feedback since the last update ({len(rows)} observations logged)")
+        return None
+
+    X, y, _, _, _ = load_dataset("yield", artifact_dir)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, **SPLIT)
+    fX, fy, known = encode_feedback(rows, ModelRegistry(artifact_dir).get(spec["encoders"]), X.columns)
+    held = holdout_mask(len(rows))
+    train_rows, held_rows = known & ~held, known & held
+    if not train_rows.any():
+        print(f"⚠️ none of the {len(rows)} observations match the trained encoders; a full retrain is needed")
+        return None
+
+    current = joblib.load(model_path)
+    candidate = joblib.load(model_path)
+    grown = trees_grown(entry, current)
+    if mode == "replace":
+        # the oldest trees go, the forest keeps its size
+        candidate.estimators_ = candidate.estimators_[trees:]
+    candidate.set_params(warm_start=True, n_estimators=len(candidate.estimators_) + trees, n_jobs=n_jobs,
+                         random_state=fresh_seed(current, grown))
+    start = time.perf_counter()
+    candidate.fit(pd.concat([X_train, fX[train_rows]], ignore_index=True),
+                  np.concatenate([y_train, fy[train_rows]]))
+    update_seconds = time.perf_counter() - start
+    candidate.set_params(warm_start=False, n_jobs=None, random_state=current.random_state)
+
+    checks = {"holdout": (X_test, y_test)}
+    if held_rows.any():
+        checks["feedback"] = (fX[held_rows], fy[held_rows])
+    before = {name: score(spec, y_, current.predict(X_)) for name, (X_, y_) in checks.items()}
+    after = {name: score(spec, y_, candidate.predict(X_)) for name, (X_, y_) in checks.items()}
+    regressed = [name for name in checks if after[name]["r2"] < before[name]["r2"] - tolerance]
+
+    # the last full fit, scaled to today's rows; without one, the new trees' pace over the whole forest
+    if entry.get("fit_seconds"):
+        full_seconds = entry["fit_seconds"] * (len(X_train) + train_rows.sum()) / len(X_train)
+    else:
+        full_seconds = update_seconds / trees * len(candidate.estimators_)
+    report = {
+        "mode": mode, "trees_added": trees, "n_estimators": len(candidate.estimators_), "trees_grown": grown + trees,
+        "feedback_rows": len(rows), "new_feedback_rows": len(rows) - consumed,
+        "feedback_used": int(train_rows.sum()), "feedback_held_out": int(held_rows.sum()),
+        "feedback_unknown": int((~known).sum()), "before": before, "after": after,
+        "update_seconds": update_seconds, "full_refit_seconds": full_seconds,
+        "seconds_saved": full_seconds - update_seconds, "accepted": not regressed,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    with open(os.path.join(artifact_dir, REPORT_FILE), "w") as f:
+        json.dump(report, f, indent=2)
+
+    for name in checks:
+        print(f"   {name}: R² {before[name]['r2']:.4f} -> {after[name]['r2']:.4f}, "
+              f"MAE {before[name]['mae']:.2f} -> {after[name]['mae']:.2f}")
+    print(f"   {trees} trees in {update_seconds:.1f}s vs ~{full_seconds:.1f}s for a full refit "
+          f"({report['seconds_saved']:.1f}s saved)")
+    if regressed:
+        print(f"❌ yield model not updated: accuracy dropped on {', '.join(regressed)}")
+        return report
+
+    _save_model(candidate, model_path)
+    entry = dict(entry, metrics=after["holdout"], feedback_rows=len(rows), trees_grown=report["trees_grown"],
+                 updates=entry.get("updates", []) + [{k: report[k] for k in (
+                     "mode", "trees_added", "n_estimators", "feedback_rows", "update_seconds", "updated_at")}])
+    manifest["yield"] = entry
+    write_manifest(artifact_dir, manifest)
+    print(f"✅ yield model updated with {report['feedback_used']} observations "
+          f"({len(candidate.estimators_)} trees), saved at {model_path}")
+    return report
+
+
+def ingest(artifact_dir, csv_path):
+    # bulk-load observations (form columns + observed_yield[, fertilizer, model_version])
+    df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+    rows = parse_feedback(df.replace("", None).to_dict("records"))
+    count = FeedbackLog(os.path.join(artifact_dir, FEEDBACK_FILE)).append(rows)
+    print(f"✅ Logged {count} observations from {csv_path}")
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the yield model from logged field feedback")
+    parser.add_argument("--artifact-dir", default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument("--ingest", metavar="CSV", help="append observations from a CSV to the feedback log first")
+    parser.add_argument("--trees", type=int, default=UPDATE_TREES, help="trees to fit on the new data")
+    parser.add_argument("--mode", choices=["grow", "replace"], default="grow",
+                        help="grow: add the trees; replace: drop as many of the oldest trees")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="largest acceptable R² drop")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--force", action="store_true", help="update even without new feedback")
+    parser.add_argument("--release", action="store_true", help="publish the updated model as a new release")
+    args = parser.parse_args(argv)
+
+    if args.ingest:
+        ingest(args.artifact_dir, args.ingest)
+    report = update(args.artifact_dir, args.trees, args.mode, args.tolerance, args.n_jobs, args.force)
+    if report is None:
+        return None
+    if not report["accepted"]:
+        sys.exit(1)
+    from export_models import export_all
+    export_all(args.artifact_dir)
+    if has_yield_table(args.artifact_dir):
+        from build_yield_table import build as build_yield_table
+        build_yield_table(args.artifact_dir)
+    if args.release:
+        from release import publish
+        publish(args.artifact_dir)
+    return report
+
+
+if __name__ == "__main__":
+    main()